@@ -1 +1,13 @@
-from .newspaper3k_haystack import newspaper3k_scraper, newspaper3k_crawler
\ No newline at end of file
+from .newspaper3k_haystack import newspaper3k_scraper, newspaper3k_crawler
+from .nlp import newspaper3k_nlp
+from .cache import ResponseCache
+from .archive import HtmlArchive
+from .writer import BatchWriter
+from .frontier import Frontier, depth_score, HostRoundRobin, FilterMatchScore
+from .seen import HashSeenSet, BloomSeenSet, DiskSeenSet
+from .urls import canonicalize_url
+from .filters import UrlFilter
+from .dedup import NearDuplicateFilter
+from .resilience import RetryPolicy, HostHealth, HostUnavailable
+from .metrics import Metrics
+from .distributed import SQLiteQueue, RedisQueue, crawl_sharded
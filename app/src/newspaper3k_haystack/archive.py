@@ -0,0 +1,166 @@
+import os
+import mmap
+import zlib
+import struct
+import threading
+
+EXTENSION = ".harc"
+MAGIC = b"HARC"
+HEADER = struct.Struct("<4sII") #magic, url length, compressed html length
+
+
+class HtmlArchive:
+    '''
+    Append only archive of downloaded pages stored in a single file.
+    Each record is a small header followed by the url and the zlib compressed html, so records can be read one at a time
+    through a memory map without decompressing the whole file. A sidecar index file (path + ".idx") keeps the offset of
+    every url for random access, it is rebuilt by scanning the archive if missing and completed if it's behind the archive.
+    '''
+
+    def __init__(self, path: str):
+        '''
+        :param path: archive file, created on the first append if it doesn't exist.
+        '''
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._file = None
+        self._index = None
+
+    def append(self, url: str, html):
+        '''
+        Appends a page to the archive and returns the offset of its record.
+        '''
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        url_bytes = url.encode("utf-8")
+        body = zlib.compress(html)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            offset = self._file.tell()
+            self._file.write(HEADER.pack(MAGIC, len(url_bytes), len(body)) + url_bytes + body)
+            self._file.flush()
+            #index written after the record, a crash in between only loses the index line which index() rebuilds
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                index_file.write(f"{offset}\t{url}\n")
+            if self._index is not None:
+                self._index[url] = offset
+        return offset
+
+    def index(self):
+        '''
+        Returns a dict url -> record offset, the last record wins if an url was archived more than once.
+        '''
+        if self._index is None:
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+                self._index = self._load_index()
+        return self._index
+
+    def get(self, url: str):
+        '''
+        Returns the html (bytes) archived for url, or None if it isn't in the archive.
+        '''
+        offset = self.index().get(url)
+        if offset is None:
+            return None
+        with self._mmap() as data:
+            _, html = self._read(data, offset)[1:]
+        return html
+
+    def records(self):
+        '''
+        Generator of (url, html bytes) for every record in the archive, in the order they were written.
+        '''
+        for _, url, html in self._scan():
+            yield url, html
+
+    def __iter__(self):
+        return self.records()
+
+    def __len__(self):
+        return len(self.index())
+
+    def __contains__(self, url: str):
+        return url in self.index()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _mmap(self):
+        with open(self.path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read(self, data, offset: int):
+        magic, url_len, body_len = HEADER.unpack_from(data, offset)
+        if magic != MAGIC:
+            raise ValueError(f"Corrupted archive {self.path} at offset {offset}")
+        start = offset + HEADER.size
+        url = data[start:start + url_len].decode("utf-8")
+        body = data[start + url_len:start + url_len + body_len]
+        return start + url_len + body_len, url, zlib.decompress(body)
+
+    def _load_index(self):
+        '''
+        Reads the index file and indexes the records written after its last line (e.g. if a crash happened between
+        writing a record and its index line), rewriting the index file if it had to be repaired.
+        '''
+        index = {}
+        complete = True
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as index_file:
+                for line in index_file:
+                    if not line.endswith("\n"): #interrupted write of the last line
+                        complete = False
+                        break
+                    offset, url = line.rstrip("\n").split("\t", 1)
+                    index[url] = int(offset)
+        else:
+            complete = False
+        end = self._record_end(max(index.values())) if index else 0
+        if end is None: #index pointing past the archive, start over
+            index, end = {}, 0
+            complete = False
+        for offset, url, _ in self._scan(end):
+            index[url] = offset
+            complete = False
+        if not complete:
+            with open(self.index_path + ".tmp", "w", encoding="utf-8") as index_file:
+                for url, offset in sorted(index.items(), key=lambda item: item[1]):
+                    index_file.write(f"{offset}\t{url}\n")
+            os.replace(self.index_path + ".tmp", self.index_path)
+        return index
+
+    def _record_end(self, offset: int):
+        '''
+        Offset right after the record at offset, None if there is no whole record there.
+        '''
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            header = file.read(HEADER.size)
+            size = os.fstat(file.fileno()).st_size
+        if len(header) < HEADER.size:
+            return None
+        magic, url_len, body_len = HEADER.unpack(header)
+        end = offset + HEADER.size + url_len + body_len
+        return end if magic == MAGIC and end <= size else None
+
+    def _scan(self, start: int = 0):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= start:
+            return
+        with self._mmap() as data:
+            offset = start
+            while offset + HEADER.size <= len(data):
+                try:
+                    next_offset, url, html = self._read(data, offset)
+                except (zlib.error, struct.error, ValueError):
+                    break #truncated last record from an interrupted write
+                yield offset, url, html
+                offset = next_offset
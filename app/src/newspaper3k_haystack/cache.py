@@ -0,0 +1,117 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+from .urls import normalize_url
+
+CacheEntry = namedtuple("CacheEntry", ["html", "etag", "last_modified", "stored_at", "url"]) #url the page was served from, after redirects
+
+
+class ResponseCache:
+    '''
+    Persistent on-disk cache of downloaded pages, keyed by normalized url.
+    Entries older than ttl are revalidated with a conditional request (ETag / Last-Modified) instead of downloaded again,
+    and the least recently used entries are evicted once the cache grows over max_size.
+    Pages are stored zlib compressed in a sqlite database inside directory, so it can be shared between nodes and processes.
+    '''
+
+    def __init__(self,
+    directory: str,
+    ttl: float = 24*3600,
+    max_size: int = 1024**3
+    ):
+        '''
+        :param directory: folder where the cache database is stored, created if it doesn't exist.
+        :param ttl: (1 day by default) seconds an entry is served without asking the server again.
+        :param max_size: (1GB by default) max size in bytes of the stored (compressed) pages.
+        '''
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "cache.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            body BLOB,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL,
+            accessed_at REAL,
+            size INTEGER)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def key(url: str):
+        return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def get(self, url: str):
+        '''
+        Returns the CacheEntry stored for url, or None. Fresh or not, use is_fresh to check.
+        The html of the entry is returned as bytes (utf-8 if it was stored as a string), newspaper Article.set_html accepts both.
+        '''
+        key = self.key(url)
+        with self._lock:
+            row = self._db.execute("SELECT body, etag, last_modified, stored_at, url FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET accessed_at=? WHERE key=?", (time.time(), key))
+        body, etag, last_modified, stored_at, final_url = row
+        return CacheEntry(zlib.decompress(body), etag, last_modified, stored_at, final_url)
+
+    def is_fresh(self, entry: CacheEntry):
+        return time.time() - entry.stored_at < self.ttl
+
+    def put(self, url: str, html, etag: str = None, last_modified: str = None, final_url: str = None):
+        '''
+        Stores the html of url, final_url is the url it was served from if it was redirected.
+        '''
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        body = zlib.compress(html)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key=?", (self.key(url),)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?)",
+                (self.key(url), final_url or url, body, etag, last_modified, now, now, len(body)))
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def refresh(self, url: str):
+        '''
+        Marks the entry of url as fresh again, used when the server answered 304 Not Modified.
+        '''
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE entries SET stored_at=?, accessed_at=? WHERE key=?", (now, now, self.key(url)))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._size = 0
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        #drop least recently used entries until we are 10% under max_size, to not evict on every put
+        target = self.max_size * 0.9
+        rows = self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at")
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM entries WHERE key=?", evicted)
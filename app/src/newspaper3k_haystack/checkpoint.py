@@ -0,0 +1,47 @@
+import os
+import pickle
+from .seen import HashSeenSet, DiskSeenSet, _remove_database
+
+
+class CrawlCheckpoint:
+    '''
+    Crawl state saved to a local file so a killed crawl can be resumed: frontier (queue and seen set),
+    counters, urls that were being scraped and the number of documents already returned.
+    Every save writes a temporary file and atomically renames it, a crash while saving keeps the previous checkpoint.
+    A HashSeenSet frontier seen set is saved incrementally to path + ".seen", each save only writes the urls seen since the previous one.
+    A temporary DiskSeenSet is moved to path + ".seen" so it outlives the crawler, loading it drops the urls seen after the save.
+    '''
+
+    def __init__(self, path: str):
+        '''
+        :param path: checkpoint file.
+        '''
+        self.path = path
+        self.seen_path = path + ".seen"
+
+    def save(self, state: dict):
+        seen = state["frontier"].seen_set if "frontier" in state else None
+        if isinstance(seen, HashSeenSet) and seen.journal_path != self.seen_path:
+            seen.journal(self.seen_path)
+        elif isinstance(seen, DiskSeenSet) and seen.temporary:
+            seen.move(self.seen_path)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        '''
+        Returns the saved state, None if there is no checkpoint.
+        '''
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as file:
+            return pickle.load(file)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        _remove_database(self.seen_path) #journal or sqlite database
@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+
+def host_of(url: str):
+    '''
+    Returns the lowercased host of an url, or an empty string if it has none (e.g. local paths).
+    '''
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def imap_per_host(fn, items: list, workers: int, max_per_host: int = None, ordered: bool = True):
+    '''
+    Calls fn(item) for every url in items on a pool of threads.
+    Hosts are served round robin and no more than max_per_host calls run against the same host at once,
+    so a batch dominated by one site doesn't leave the other hosts waiting behind it.
+
+    :param fn: function to call with each item.
+    :param items: list of urls.
+    :param workers: number of threads.
+    :param max_per_host: (None by default) max concurrent calls per host, if None unlimited.
+    :param ordered: (True by default) if True results are yielded in input order, otherwise as soon as they complete.
+    :return: generator of (index, result) tuples.
+    '''
+    pending = defaultdict(deque) #host -> queue of (index,item) waiting to be submitted
+    for idx, item in enumerate(items):
+        pending[host_of(item)].append((idx, item))
+    hosts = deque(pending.keys()) #round robin over hosts that still have items
+    in_flight = defaultdict(int)
+    futures = {}
+    buffered = {}
+    next_idx = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while hosts or futures:
+            #fill free worker slots, skipping hosts that are at their cap
+            skipped = 0
+            while hosts and len(futures) < workers and skipped < len(hosts):
+                host = hosts[0]
+                if max_per_host is not None and in_flight[host] >= max_per_host:
+                    hosts.rotate(-1)
+                    skipped += 1
+                    continue
+                idx, item = pending[host].popleft()
+                if pending[host]:
+                    hosts.rotate(-1)
+                else:
+                    hosts.popleft()
+                    del pending[host]
+                in_flight[host] += 1
+                futures[pool.submit(fn, item)] = (idx, host)
+                skipped = 0
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, host = futures.pop(future)
+                in_flight[host] -= 1
+                result = future.result()
+                if not ordered:
+                    yield idx, result
+                    continue
+                buffered[idx] = result
+                while next_idx in buffered:
+                    yield next_idx, buffered.pop(next_idx)
+                    next_idx += 1
+
+
+class HostScheduler:
+    '''
+    Politeness bookkeeping for concurrent crawls: a host is ready for a new request once min_delay seconds
+    passed since the last request to it started and it has less than max_in_flight requests running.
+    If a HostHealth is given hosts are also held back while their circuit is open.
+    Not thread safe, meant to be used by a single dispatcher thread.
+    '''
+
+    def __init__(self, min_delay: float = 0.0, max_in_flight: int = 1, health = None):
+        '''
+        :param min_delay: (0 by default) min seconds between the start of two requests to the same host.
+        :param max_in_flight: (1 by default) max concurrent requests to the same host.
+        :param health: (None by default) HostHealth whose paused hosts aren't ready until their cooldown ends.
+        '''
+        self.min_delay = min_delay
+        self.max_in_flight = max_in_flight
+        self.health = health
+        self._last_start = {}
+        self._in_flight = defaultdict(int)
+
+    def wait_time(self, host: str):
+        '''
+        Seconds until host is ready, None if it has to wait for one of its requests to finish.
+        '''
+        if self._in_flight.get(host,0) >= self.max_in_flight:
+            return None
+        cooldown = self.health.cooldown_left(host) if self.health is not None else 0.0
+        last = self._last_start.get(host)
+        if last is None:
+            return cooldown
+        return max(cooldown, last + self.min_delay - time.monotonic())
+
+    def ready(self, host: str):
+        return self.wait_time(host) == 0.0
+
+    def acquire(self, host: str):
+        self._in_flight[host] += 1
+        self._last_start[host] = time.monotonic()
+
+    def release(self, host: str):
+        self._in_flight[host] -= 1
+        if self._in_flight[host] == 0:
+            del self._in_flight[host]
@@ -0,0 +1,96 @@
+import re
+import hashlib
+import threading
+from collections import deque
+
+WORD = re.compile(r"\w+")
+BITS = 64
+
+
+def simhash(text: str, shingle: int = 3):
+    '''
+    64 bit SimHash of the word shingles of text: near duplicate texts get fingerprints that differ in few bits.
+    '''
+    words = WORD.findall(text.lower())
+    features = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    hashes = [format(int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"), "064b") for feature in features]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for column in zip(*hashes): #bit counts per position, most significant first
+        fingerprint = (fingerprint << 1) | (column.count("1") > half)
+    return fingerprint
+
+
+class NearDuplicateFilter:
+    '''
+    Finds articles whose text is a near duplicate of one seen before (syndicated stories, amp pages, print views...).
+    Texts are compared by SimHash, two texts are duplicates if their fingerprints differ in at most distance bits.
+    Fingerprints are indexed by distance+1 bands so a lookup only compares a few candidates, and only the last max_size texts
+    are remembered. Thread safe.
+    '''
+
+    def __init__(self, distance: int = 6, max_size: int = 100000, tag: bool = False, shingle: int = 3):
+        '''
+        :param distance: (6 by default) max number of different bits (out of 64) of two near duplicate texts, 0 only finds exact duplicates.
+            Unrelated articles differ in about 32 bits, a few edited words in a long article in less than 6.
+        :param max_size: (100000 by default) max number of texts remembered, the oldest ones are forgotten first.
+        :param tag: (False by default) if False duplicates are dropped, if True they are kept with the url of the first copy
+            as duplicate_of metadata (and without keywords or summary, the nlp is skipped).
+        :param shingle: (3 by default) number of consecutive words of each feature of the SimHash.
+        '''
+        assert 0 <= distance < BITS, f"distance must be between 0 and {BITS - 1}"
+        self.distance = distance
+        self.max_size = max_size
+        self.tag = tag
+        self.shingle = shingle
+        n_bands = distance + 1
+        width = BITS // n_bands
+        #(shift, mask) of each band, the last one takes the remaining bits
+        self._bands = [(i * width, (1 << (width if i < n_bands - 1 else BITS - i * width)) - 1) for i in range(n_bands)]
+        self._tables = [{} for _ in self._bands] #band value -> list of (fingerprint, key)
+        self._order = deque() #(fingerprint, key) in insertion order, to forget the oldest
+        self._lock = threading.Lock()
+
+    def check(self, text: str, key: str):
+        '''
+        Returns the key (e.g. url) of the text text is a near duplicate of, or None if it's new, in which case it's remembered with key.
+        '''
+        fingerprint = simhash(text, self.shingle)
+        with self._lock:
+            original = self._find(fingerprint)
+            if original is None:
+                self._add(fingerprint, key)
+            return original
+
+    def clear(self):
+        with self._lock:
+            for table in self._tables:
+                table.clear()
+            self._order.clear()
+
+    def __len__(self):
+        return len(self._order)
+
+    def _find(self, fingerprint: int):
+        for (shift, mask), table in zip(self._bands, self._tables):
+            for other, key in table.get((fingerprint >> shift) & mask, ()):
+                if bin(fingerprint ^ other).count("1") <= self.distance:
+                    return key
+        return None
+
+    def _add(self, fingerprint: int, key: str):
+        entry = (fingerprint, key)
+        for (shift, mask), table in zip(self._bands, self._tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append(entry)
+        self._order.append(entry)
+        if len(self._order) > self.max_size:
+            self._remove(self._order.popleft())
+
+    def _remove(self, entry: tuple):
+        fingerprint = entry[0]
+        for (shift, mask), table in zip(self._bands, self._tables):
+            band = (fingerprint >> shift) & mask
+            entries = table[band]
+            entries.remove(entry)
+            if not entries:
+                del table[band]
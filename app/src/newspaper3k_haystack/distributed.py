@@ -0,0 +1,324 @@
+import time
+import sqlite3
+import hashlib
+from .concurrency import host_of
+from .seen import fingerprint
+
+try:
+    import redis
+except ImportError: #only needed for RedisQueue
+    redis = None
+
+PENDING, CLAIMED, DONE = 0, 1, 2
+
+
+def shard_of(url: str, n_shards: int):
+    '''
+    Shard an url belongs to, all the urls of a host go to the same shard so per host politeness stays local to one worker.
+    Stable across processes and machines (unlike hash()).
+    '''
+    digest = hashlib.blake2b(host_of(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n_shards
+
+
+class SQLiteQueue:
+    '''
+    Crawl frontier shared by the worker processes of a sharded crawl, stored in a sqlite database.
+    Urls are deduplicated globally (canonical url fingerprint) and partitioned by host hash: each worker only claims urls of its shard,
+    links it finds are handed to the shard of their host. Also keeps the global count of scraped articles.
+    A claimed url is leased to its worker: if the lease expires before the worker reports it done (e.g. the worker died) the url is queued again,
+    and the urls of a shard whose worker stopped claiming for longer than a lease are taken over by the other workers.
+    Works for processes on the same machine, use RedisQueue across machines.
+    '''
+
+    def __init__(self, path: str, n_shards: int, lease: float = 300):
+        '''
+        :param path: sqlite database file, created if it doesn't exist.
+        :param n_shards: number of shards (workers) the frontier is partitioned in.
+        :param lease: (300 by default) seconds a worker has to scrape a claimed url, must be longer than the slowest page (retries included).
+        '''
+        self.path = path
+        self.n_shards = n_shards
+        self.lease = lease
+        self._claims = {} #fingerprint -> lease expiration of the urls claimed through this connection
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS urls (
+            fingerprint INTEGER PRIMARY KEY,
+            url TEXT,
+            depth INTEGER,
+            shard INTEGER,
+            state INTEGER,
+            seq INTEGER,
+            expires REAL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS urls_claim ON urls(shard, state, seq)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS urls_lease ON urls(state, expires)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS workers (shard INTEGER PRIMARY KEY, seen_at REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO counters VALUES ('front',0),('back',0),('scraped',0)")
+
+    def push_links(self, links: list, depth: int, beam: int = 0):
+        '''
+        Queues new urls in their shard, the first beam of the new ones at the front of it keeping their order.
+        Returns the number of new urls queued.
+        '''
+        with self._transaction():
+            new = {}
+            for url in links:
+                key = fingerprint(url)
+                if key not in new and self._db.execute("SELECT 1 FROM urls WHERE fingerprint=?", (key,)).fetchone() is None:
+                    new[key] = url
+            n_front = min(beam, len(new))
+            front = self._counter("front")
+            back = self._counter("back")
+            rows = []
+            for i, (key, url) in enumerate(new.items()):
+                if i < n_front:
+                    seq = front - n_front + i #smaller than anything queued before
+                else:
+                    back += 1
+                    seq = back
+                rows.append((key, url, depth, shard_of(url, self.n_shards), PENDING, seq, None))
+            front -= n_front
+            self._db.execute("UPDATE counters SET value=? WHERE name='front'", (front,))
+            self._db.execute("UPDATE counters SET value=? WHERE name='back'", (back,))
+            self._db.executemany("INSERT INTO urls VALUES (?,?,?,?,?,?,?)", rows)
+            return len(rows)
+
+    def claim(self, shard: int, n_articles: int = None):
+        '''
+        Returns the next (url, depth) of the shard and leases it to this worker, None if the shard has nothing queued
+        or n_articles (if given) are already scraped or being scraped. If the shard is empty the next url of a shard
+        whose worker stopped claiming is returned instead. Expired leases are put back in the queue first.
+        '''
+        now = time.time()
+        with self._transaction():
+            self._db.execute("INSERT OR REPLACE INTO workers VALUES (?,?)", (shard, now))
+            self._db.execute("UPDATE urls SET state=?, expires=NULL WHERE state=? AND expires<?", (PENDING, CLAIMED, now))
+            if n_articles is not None:
+                claimed = self._db.execute("SELECT COUNT(*) FROM urls WHERE state=?", (CLAIMED,)).fetchone()[0]
+                if self._counter("scraped") + claimed >= n_articles: #every article left is being scraped
+                    return None
+            row = self._next(shard)
+            if row is None:
+                for (orphan,) in self._db.execute("SELECT shard FROM workers WHERE seen_at<?", (now - self.lease,)).fetchall():
+                    row = self._next(orphan)
+                    if row is not None:
+                        break
+            if row is None:
+                return None
+            self._db.execute("UPDATE urls SET state=?, expires=? WHERE fingerprint=?", (CLAIMED, now + self.lease, row[0]))
+        self._claims[row[0]] = now + self.lease
+        return row[1], row[2]
+
+    def done(self, url: str, scraped: bool = False):
+        '''
+        Marks a claimed url as crawled, counted as a scraped article if scraped.
+        Returns False if its lease expired and it was queued again, then it doesn't count.
+        '''
+        key = fingerprint(url)
+        expires = self._claims.pop(key, None)
+        with self._transaction():
+            cursor = self._db.execute("UPDATE urls SET state=?, expires=NULL WHERE fingerprint=? AND state=? AND expires=?", (DONE, key, CLAIMED, expires))
+            if cursor.rowcount == 0:
+                return False
+            if scraped:
+                self._db.execute("UPDATE counters SET value=value+1 WHERE name='scraped'")
+        return True
+
+    def finished(self, n_articles: int):
+        '''
+        True once n_articles articles were scraped.
+        '''
+        return self._counter("scraped") >= n_articles
+
+    def idle(self):
+        '''
+        True if no shard has urls queued or being scraped, so no more links can show up.
+        '''
+        return self._db.execute("SELECT 1 FROM urls WHERE state<? LIMIT 1", (DONE,)).fetchone() is None
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM urls WHERE state=?", (PENDING,)).fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __getstate__(self):
+        #sent to worker processes, each one opens its own connection
+        return {"path": self.path, "n_shards": self.n_shards, "lease": self.lease}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["n_shards"], state["lease"])
+
+    def _next(self, shard: int):
+        return self._db.execute("SELECT fingerprint, url, depth FROM urls WHERE shard=? AND state=? ORDER BY seq LIMIT 1", (shard, PENDING)).fetchone()
+
+    def _counter(self, name: str):
+        return self._db.execute("SELECT value FROM counters WHERE name=?", (name,)).fetchone()[0]
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+
+class _Transaction:
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE") #take the write lock now so two workers can't claim the same url
+        return self.db
+
+    def __exit__(self, exc_type, *exc):
+        self.db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+#atomic claim of RedisQueue, same steps as SQLiteQueue.claim
+#KEYS: scraped counter, worker heartbeats, claims (sorted by lease expiration), claim sequence, queue of each shard
+#ARGV: shard, n_articles (-1 for no limit), lease, now. A claim is "<sequence> <shard> <depth> <url>".
+_CLAIM_SCRIPT = """
+local shard, n_articles, lease, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+redis.call('HSET', KEYS[2], shard, now)
+for _, claim in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+    redis.call('ZREM', KEYS[3], claim)
+    local owner, item = string.match(claim, '^%d+ (%d+) (.*)$')
+    redis.call('LPUSH', KEYS[5 + tonumber(owner)], item)
+end
+if n_articles >= 0 and tonumber(redis.call('GET', KEYS[1]) or 0) + redis.call('ZCARD', KEYS[3]) >= n_articles then
+    return nil
+end
+local item = redis.call('LPOP', KEYS[5 + shard])
+if not item then
+    for other = 0, #KEYS - 5 do
+        local seen_at = redis.call('HGET', KEYS[2], other)
+        if seen_at and tonumber(seen_at) < now - lease then
+            item = redis.call('LPOP', KEYS[5 + other])
+            if item then
+                shard = other
+                break
+            end
+        end
+    end
+end
+if not item then
+    return nil
+end
+local claim = redis.call('INCR', KEYS[4]) .. ' ' .. shard .. ' ' .. item
+redis.call('ZADD', KEYS[3], now + lease, claim)
+return claim
+"""
+
+
+class RedisQueue:
+    '''
+    Same as SQLiteQueue but stored in redis (pip install redis), so workers on several machines can share one crawl.
+    Leases use the clock of the workers, their machines must have synchronized clocks.
+    '''
+
+    def __init__(self, n_shards: int, name: str = "newspaper3k_crawl", url: str = "redis://localhost:6379/0", lease: float = 300):
+        '''
+        :param n_shards: number of shards (workers) the frontier is partitioned in.
+        :param name: ("newspaper3k_crawl" by default) prefix of the redis keys of this crawl.
+        :param url: ("redis://localhost:6379/0" by default) redis server.
+        :param lease: (300 by default) seconds a worker has to scrape a claimed url, must be longer than the slowest page (retries included).
+        '''
+        if redis is None:
+            raise ImportError("redis is needed for RedisQueue, install it with: pip install redis")
+        self.n_shards = n_shards
+        self.name = name
+        self.url = url
+        self.lease = lease
+        self._claims = {} #url -> claim of the urls claimed through this connection
+        self._redis = redis.Redis.from_url(url)
+        self._claim = self._redis.register_script(_CLAIM_SCRIPT)
+
+    def push_links(self, links: list, depth: int, beam: int = 0):
+        pipe = self._redis.pipeline()
+        for url in links:
+            pipe.sadd(self.name + ":seen", fingerprint(url))
+        new = [url for url, is_new in zip(links, pipe.execute()) if is_new]
+        pipe = self._redis.pipeline()
+        #first beam new links pushed to the front in reverse, so the first one ends up first
+        for url in reversed(new[:beam]):
+            pipe.lpush(self._shard_key(url), f"{depth} {url}")
+        for url in new[beam:]:
+            pipe.rpush(self._shard_key(url), f"{depth} {url}")
+        pipe.execute()
+        return len(new)
+
+    def claim(self, shard: int, n_articles: int = None):
+        keys = [self.name + ":scraped", self.name + ":workers", self.name + ":claims", self.name + ":claim_seq"]
+        keys += [f"{self.name}:queue:{i}" for i in range(self.n_shards)]
+        claim = self._claim(keys=keys, args=[shard, -1 if n_articles is None else n_articles, self.lease, time.time()])
+        if claim is None:
+            return None
+        claim = claim.decode("utf-8")
+        _, _, depth, url = claim.split(" ", 3)
+        self._claims[url] = claim
+        return url, int(depth)
+
+    def done(self, url: str, scraped: bool = False):
+        claim = self._claims.pop(url, None)
+        if claim is None or not self._redis.zrem(self.name + ":claims", claim):
+            return False
+        if scraped:
+            self._redis.incr(self.name + ":scraped")
+        return True
+
+    def finished(self, n_articles: int):
+        return int(self._redis.get(self.name + ":scraped") or 0) >= n_articles
+
+    def idle(self):
+        pipe = self._redis.pipeline(transaction=True) #one snapshot, an url moves from a queue to the claims atomically
+        pipe.zcard(self.name + ":claims")
+        for shard in range(self.n_shards):
+            pipe.llen(f"{self.name}:queue:{shard}")
+        return sum(pipe.execute()) == 0
+
+    def __len__(self):
+        pipe = self._redis.pipeline()
+        for shard in range(self.n_shards):
+            pipe.llen(f"{self.name}:queue:{shard}")
+        return sum(pipe.execute())
+
+    def close(self):
+        self._redis.close()
+
+    def __getstate__(self):
+        return {"n_shards": self.n_shards, "name": self.name, "url": self.url, "lease": self.lease}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _shard_key(self, url: str):
+        return f"{self.name}:queue:{shard_of(url, self.n_shards)}"
+
+
+def _crawl_shard(crawler_kwargs: dict, run_kwargs: dict):
+    '''
+    Process pool worker of crawl_sharded.
+    '''
+    from .newspaper3k_haystack import newspaper3k_crawler
+    with newspaper3k_crawler(**crawler_kwargs) as crawler:
+        return crawler.run_shard(**run_kwargs)[0]["documents"]
+
+
+def crawl_sharded(query, n_articles: int, queue, crawler_kwargs: dict = None, poll_interval: float = 1.0, **run_kwargs):
+    '''
+    Crawls with one process per shard of queue, each one running newspaper3k_crawler.run_shard. Returns the documents of all shards.
+    :param query: initial url or list of urls.
+    :param n_articles: total number of articles to scrape across all shards.
+    :param queue: SQLiteQueue or RedisQueue, its n_shards is the number of processes.
+    :param crawler_kwargs: (None by default) arguments to build the newspaper3k_crawler of each process.
+    :param poll_interval: (1 by default) seconds a worker waits for links when its shard is empty.
+    :param run_kwargs: other arguments of run_shard (beam, filters, metadata...).
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=queue.n_shards) as pool:
+        futures = [pool.submit(_crawl_shard, crawler_kwargs or {}, dict(run_kwargs, query=query, n_articles=n_articles, queue=queue, shard=shard, poll_interval=poll_interval))
+            for shard in range(queue.n_shards)]
+        documents = []
+        for future in futures:
+            documents += future.result()
+    return documents
@@ -0,0 +1,50 @@
+import copy
+from newspaper.cleaners import DocumentCleaner
+from newspaper.outputformatters import OutputFormatter
+
+#extraction profiles: flags forced on every scrape, wether newspaper extracts the metadata (authors, dates, images, movies...)
+#even when it's not asked for, and wether it downloads images to pick the top image
+PROFILES = {
+    "text-only": {"flags": {}, "parse_meta": False, "fetch_images": False},
+    "text+meta": {"flags": {"metadata": True}, "parse_meta": True, "fetch_images": False},
+    "full": {"flags": {"metadata": True, "links": True, "keywords": True, "summary": True}, "parse_meta": True, "fetch_images": True},
+}
+
+
+def get_profile(profile: str):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown extraction profile {profile}, available profiles are: {', '.join(PROFILES)}")
+    return PROFILES[profile]
+
+
+def parse_article(article, full: bool = True):
+    '''
+    Parses an article whose html is already set. If full is False only the steps the document text, title and language need
+    are run, same text as Article.parse but without the authors, dates, tags, movies and images passes.
+    '''
+    if full:
+        article.parse()
+        return
+
+    article.throw_if_not_downloaded_verbose()
+    article.doc = article.config.get_parser().fromstring(article.html)
+    article.clean_doc = copy.deepcopy(article.doc) #untouched copy, the links are extracted from it
+    if article.doc is None:
+        return
+
+    output_formatter = OutputFormatter(article.config)
+    article.set_title(article.extractor.get_title(article.clean_doc))
+    article.set_meta_language(article.extractor.get_meta_lang(article.clean_doc))
+    if article.config.use_meta_language:
+        article.extractor.update_language(article.meta_lang)
+        output_formatter.update_language(article.meta_lang)
+
+    article.doc = DocumentCleaner(article.config).clean(article.doc)
+    article.top_node = article.extractor.calculate_best_node(article.doc)
+    if article.top_node is not None:
+        article.top_node = article.extractor.post_cleanup(article.top_node)
+        text, article_html = output_formatter.get_formatted(article.top_node)
+        article.set_article_html(article_html)
+        article.set_text(text)
+
+    article.is_parsed = True
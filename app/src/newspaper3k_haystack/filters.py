@@ -0,0 +1,150 @@
+import re
+from .concurrency import host_of
+
+try:
+    import ahocorasick
+except ImportError: #optional, literals are matched with a single regex otherwise
+    ahocorasick = None
+
+REGEX_CHARS = set(".^$*+?{}[]\\|()")
+#backreferences and global inline flags change meaning inside a combined alternation, group names can't be repeated in it
+UNCOMBINABLE = re.compile(r"\\[1-9]|\(\?P[=<]|^\(\?[aiLmsux]+\)")
+
+
+def is_literal(pattern: str):
+    '''
+    True if pattern has no regex special characters, so searching it is a plain substring search.
+    '''
+    return not REGEX_CHARS.intersection(pattern)
+
+
+class _LiteralMatcher:
+    '''
+    Finds if any of a set of plain substrings is in a string in one pass,
+    with an Aho-Corasick automaton if pyahocorasick is installed or a single alternation regex otherwise.
+    '''
+
+    def __init__(self, literals: list):
+        self.empty = len(literals) == 0
+        if self.empty:
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for literal in literals:
+                self._automaton.add_word(literal, literal)
+            self._automaton.make_automaton()
+            self.search = self._search_automaton
+        else:
+            self._regex = re.compile("|".join(re.escape(literal) for literal in sorted(literals, key=len, reverse=True)))
+            self.search = self._search_regex
+
+    def _search_automaton(self, text: str):
+        return next(self._automaton.iter(text), None) is not None
+
+    def _search_regex(self, text: str):
+        return self._regex.search(text) is not None
+
+
+class _PatternMatcher:
+    '''
+    Finds if any of a list of patterns matches a string: literals through _LiteralMatcher and
+    the rest combined in a single alternation regex, compiled once.
+    '''
+
+    def __init__(self, patterns: list):
+        self.empty = len(patterns) == 0
+        self._literals = _LiteralMatcher([p for p in patterns if is_literal(p)])
+        regexes = [p for p in patterns if not is_literal(p)]
+        combined = [p for p in regexes if not UNCOMBINABLE.search(p)]
+        self._regexes = [re.compile(p) for p in regexes if UNCOMBINABLE.search(p)] #searched one by one
+        if combined:
+            self._regexes.insert(0, re.compile("|".join(f"(?:{p})" for p in combined)))
+
+    def search(self, text: str):
+        if not self._literals.empty and self._literals.search(text):
+            return True
+        return any(regex.search(text) for regex in self._regexes)
+
+
+class _HostTrie:
+    '''
+    Trie of domains by their labels from right to left, a domain matches itself and all its subdomains.
+    '''
+
+    def __init__(self, domains: list):
+        self.empty = len(domains) == 0
+        self._root = {}
+        for domain in domains:
+            node = self._root
+            for label in reversed(domain.lower().strip(".").split(".")):
+                node = node.setdefault(label, {})
+            node[None] = True #end of a domain
+
+    def match(self, host: str):
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+
+class UrlFilter:
+    '''
+    Url filter compiled once: an url passes if it matches at least one positive pattern and none of the negative ones
+    (regex search, like re.search, same semantics as the crawler filters dict), and its host is in allow_domains (if given)
+    and not in deny_domains. Domain lists match subdomains too and their result is memoized per host.
+    '''
+
+    def __init__(self,
+    positive: list = None,
+    negative: list = None,
+    allow_domains: list = None,
+    deny_domains: list = None,
+    cache_size: int = 100000
+    ):
+        '''
+        :param positive: (None by default) patterns of which urls must match at least one. If None no positive check,
+            if an empty list no url passes.
+        :param negative: (None by default) patterns urls must not match.
+        :param allow_domains: (None by default) domains the url host must belong to, e.g. ["lonelyplanet.com"].
+        :param deny_domains: (None by default) domains the url host must not belong to, e.g. ["facebook.com", "doubleclick.net"].
+        :param cache_size: (100000 by default) max number of hosts whose domain checks are memoized.
+        '''
+        self.positive = None if positive is None else _PatternMatcher(list(positive))
+        self.negative = _PatternMatcher(list(negative or []))
+        self.allow = _HostTrie(list(allow_domains or []))
+        self.deny = _HostTrie(list(deny_domains or []))
+        self.cache_size = cache_size
+        self._host_cache = {}
+
+    @classmethod
+    def from_dict(cls, filters: dict):
+        '''
+        Builds a filter from the crawler filters dict, keys: positive, negative, allow_domains and deny_domains.
+        '''
+        return cls(filters.get("positive"), filters.get("negative"), filters.get("allow_domains"), filters.get("deny_domains"))
+
+    def __call__(self, url: str):
+        if not self._host_allowed(url):
+            return False
+        if not self.negative.empty and self.negative.search(url):
+            return False
+        return self.positive is None or self.positive.search(url)
+
+    def filter(self, urls: list):
+        return [url for url in urls if self(url)]
+
+    def _host_allowed(self, url: str):
+        if self.allow.empty and self.deny.empty:
+            return True
+        host = host_of(url)
+        allowed = self._host_cache.get(host)
+        if allowed is None:
+            allowed = (self.allow.empty or self.allow.match(host)) and not (not self.deny.empty and self.deny.match(host))
+            if len(self._host_cache) >= self.cache_size:
+                self._host_cache.clear()
+            self._host_cache[host] = allowed
+        return allowed
@@ -0,0 +1,158 @@
+import re
+import heapq
+from collections import deque, defaultdict
+from .concurrency import host_of
+from .seen import make_seen_set
+
+
+class Frontier:
+    '''
+    Queue of urls waiting to be crawled.
+    Every url is only queued once (seen set lookup, urls canonicalized by default) and push/pop don't depend on the size of the queue:
+    O(1) with the default ordering, O(log n) if a scorer is used.
+
+    Default ordering follows the crawler beam semantics: the first beam new links of a page go to the front of the queue,
+    in page order, and the rest to the back. beam=0 is a BFS, beam=1 a DFS.
+    If a scorer is given urls with a lower score are crawled first, ties broken by the beam ordering.
+    The scorer isn't pickled (it can be a lambda), set it again on the unpickled frontier.
+    '''
+
+    def __init__(self, scorer = None, seen = "hash"):
+        '''
+        :param scorer: (None by default) function (url, depth) -> number used to prioritize urls, lower first.
+            e.g. depth_score, HostRoundRobin() or FilterMatchScore(patterns)
+        :param seen: ("hash" by default) seen set backend, "hash", "bloom", "disk" or an instance from newspaper3k_haystack.seen.
+        '''
+        self.scorer = scorer
+        self._seen = make_seen_set(seen)
+        self._queue = deque() #(url, depth), used if there is no scorer
+        self._heap = [] #(score, order, url, depth), used with a scorer
+        self._front = 0 #order of urls pushed to the front, decreasing
+        self._back = 0 #order of urls pushed to the back, increasing
+
+    def push(self, url: str, depth: int = 0, front: bool = False):
+        '''
+        Queues url unless it was already seen. Returns True if it was queued.
+        '''
+        if not self._seen.add(url):
+            return False
+        self._enqueue(url, depth, front)
+        return True
+
+    def push_links(self, links: list, depth: int, beam: int = 0):
+        '''
+        Queues the links found in a page that weren't seen before, the first beam of those at the front of the queue keeping their order.
+        Seen links (e.g. navigation links back to pages already crawled) don't take beam slots.
+        Returns the number of new urls queued.
+        '''
+        new = [url for url in links if self._seen.add(url)]
+        for url in reversed(new[:beam]): #reversed so the first link ends up first
+            self._enqueue(url, depth, front=True)
+        for url in new[beam:]:
+            self._enqueue(url, depth)
+        return len(new)
+
+    def pop(self):
+        '''
+        Returns the next (url, depth) to crawl. Raises IndexError if the frontier is empty.
+        '''
+        if self.scorer is None:
+            return self._queue.popleft()
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def requeue(self, url: str, depth: int = 0):
+        '''
+        Puts back at the front of the queue an url that was popped but not crawled, even if it was already seen.
+        '''
+        if self.scorer is None:
+            self._queue.appendleft((url, depth))
+        else:
+            self._front -= 1
+            heapq.heappush(self._heap, (self.scorer(url, depth), self._front, url, depth))
+
+    def mark_seen(self, url: str):
+        '''
+        Marks url as seen without queuing it, e.g. crawl seeds.
+        '''
+        self._seen.add(url)
+
+    def seen(self, url: str):
+        return url in self._seen
+
+    @property
+    def seen_set(self):
+        return self._seen
+
+    def clear(self):
+        '''
+        Empties the queue and forgets the seen urls.
+        '''
+        self._seen.clear()
+        self._queue.clear()
+        self._heap = []
+
+    def _enqueue(self, url: str, depth: int, front: bool = False):
+        if self.scorer is None:
+            if front:
+                self._queue.appendleft((url, depth))
+            else:
+                self._queue.append((url, depth))
+            return
+        if front:
+            self._front -= 1
+            order = self._front
+        else:
+            self._back += 1
+            order = self._back
+        heapq.heappush(self._heap, (self.scorer(url, depth), order, url, depth))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["scorer"] = None
+        return state
+
+    def __len__(self):
+        return len(self._queue) if self.scorer is None else len(self._heap)
+
+    def __iter__(self):
+        '''
+        Queued urls, not in crawl order if a scorer is used.
+        '''
+        if self.scorer is None:
+            return (url for url, _ in self._queue)
+        return (url for _, _, url, _ in self._heap)
+
+
+def depth_score(url: str, depth: int):
+    '''
+    Scorer crawling the urls closest to the seed first.
+    '''
+    return depth
+
+
+class HostRoundRobin:
+    '''
+    Scorer spreading the crawl across hosts: the n-th url queued from a host gets score n,
+    so every host gets a turn before any of them gets a second one.
+    '''
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+
+    def __call__(self, url: str, depth: int):
+        host = host_of(url)
+        self.counts[host] += 1
+        return self.counts[host]
+
+
+class FilterMatchScore:
+    '''
+    Scorer crawling first the urls that match more of the given regex patterns, e.g. the crawler positive filters.
+    '''
+
+    def __init__(self, patterns: list):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+
+    def __call__(self, url: str, depth: int):
+        return -sum(1 for pattern in self.patterns if pattern.search(url))
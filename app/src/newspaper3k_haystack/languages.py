@@ -0,0 +1,97 @@
+import copy
+import threading
+from newspaper import nlp
+
+PUNKT = "tokenizers/punkt/english.pickle" #sentence tokenizer newspaper uses for summaries
+
+_nlp_stopwords = {} #lang -> stopwords of newspaper nlp, per process
+_nlp_lock = threading.Lock()
+
+
+def nlp_stopwords(lang: str):
+    '''
+    Stopwords newspaper nlp uses for lang, read from disk only the first time in each process.
+    (newspaper reads the file again on every Article.nlp call and merges the stopwords of every language it saw)
+    '''
+    if lang not in _nlp_stopwords:
+        with _nlp_lock:
+            loaded = nlp.stopwords
+            nlp.stopwords = set()
+            nlp.load_stopwords(lang)
+            _nlp_stopwords[lang] = nlp.stopwords
+            nlp.stopwords = loaded
+    return _nlp_stopwords[lang]
+
+
+def load_tokenizer():
+    '''
+    Loads the nltk sentence tokenizer of the summaries, nltk keeps it cached for the following loads.
+    '''
+    try:
+        import nltk.data
+        nltk.data.load(PUNKT)
+    except LookupError: #punkt not downloaded, nltk raises it with instructions on the first summary
+        pass
+
+
+def text_nlp(text: str, title: str, lang: str, max_sents: int, keywords: bool = True, summary: bool = True):
+    '''
+    Keywords and summary newspaper nlp finds for a text and its title (None if not asked for), stopwords loaded once per language.
+    '''
+    stopwords = nlp_stopwords(lang)
+    with _nlp_lock: #newspaper nlp functions read a module global, don't let threads of other languages switch it meanwhile
+        nlp.stopwords = stopwords
+        text_keywords = list(set(list(nlp.keywords(title).keys()) + list(nlp.keywords(text).keys()))) if keywords else None
+        text_summary = "\n".join(nlp.summarize(title=title, text=text, max_sents=max_sents)) if summary else None
+    return text_keywords, text_summary
+
+
+def article_nlp(article):
+    '''
+    Same as article.nlp() with the stopwords loaded once per language.
+    '''
+    keywords, summary = text_nlp(article.text, article.title, article.config.get_language(), article.config.MAX_SUMMARY_SENT)
+    article.set_keywords(keywords)
+    article.set_summary(summary)
+
+
+class LanguageCache:
+    '''
+    Per language copies of a newspaper Config shared by all the articles of a node, built once per language.
+    Articles created with Article(url, language=lang, config=config) change config in place (and stop using the page meta language
+    from then on), with a config per language the base one is never touched.
+    '''
+
+    def __init__(self, config, languages: list = None):
+        '''
+        :param config: newspaper Config the per language ones are copied from, used as is when no language is given.
+        :param languages: (None by default) languages to warm up right away, see warm_up.
+        '''
+        self.config = config
+        self._configs = {}
+        if languages:
+            self.warm_up(languages)
+
+    def get_config(self, lang: str = None):
+        if lang is None:
+            return self.config
+        config = self._configs.get(lang)
+        if config is None:
+            config = copy.copy(self.config)
+            config.set_language(lang)
+            self._configs[lang] = config
+        return config
+
+    def warm_up(self, languages: list, load_nlp: bool = True):
+        '''
+        Builds the configs and loads the stopwords of the given languages now instead of on their first article.
+        :param languages: list of language codes, e.g. ["en","es"].
+        :param load_nlp: (True by default) also load the keywords/summary stopwords and the sentence tokenizer.
+        '''
+        for lang in languages:
+            config = self.get_config(lang)
+            config.stopwords_class(language=lang) #newspaper caches the stopwords per language on the class
+            if load_nlp:
+                nlp_stopwords(lang)
+        if load_nlp:
+            load_tokenizer()
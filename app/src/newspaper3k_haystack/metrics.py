@@ -0,0 +1,162 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+
+#upper bounds in seconds of the latency histogram buckets, the last one catches everything
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+class _Histogram:
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "buckets": {_le(bound): n for bound, n in zip(BUCKETS, self.counts)}}
+
+
+class _Timer:
+
+    def __init__(self, metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def timed(metrics, stage: str):
+    '''
+    Context manager timing a stage in metrics, does nothing if metrics is None.
+    '''
+    return NULL_TIMER if metrics is None else _Timer(metrics, stage)
+
+
+class Metrics:
+    '''
+    Instrumentation of the scraper and crawler nodes: per stage latency histograms (download, parse, links, nlp, document),
+    counters (bytes fetched, cache hits, documents, failures by reason) and gauges (frontier size). Thread safe.
+    Read it with snapshot, to_json or to_prometheus, or get every measure as it happens through callback.
+    '''
+
+    def __init__(self, callback = None):
+        '''
+        :param callback: (None by default) function (name, value, labels) called on every measure, e.g. to forward them to statsd.
+            name is "stage_seconds" (labels {"stage": ...}), a counter name (labels {"reason": ...} for failures) or a gauge name.
+        '''
+        self.callback = callback
+        self._lock = threading.Lock()
+        self.reset()
+
+    def time(self, stage: str):
+        '''
+        Context manager recording the time spent in its block as a stage latency.
+        '''
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = _Histogram()
+            self._stages[stage].observe(seconds)
+        if self.callback is not None:
+            self.callback("stage_seconds", seconds, {"stage": stage})
+
+    def count(self, name: str, value: float = 1, reason: str = None):
+        '''
+        Adds value to a counter, e.g. count("bytes_fetched", 5120) or count("failures", reason="timeout").
+        '''
+        key = (name, reason)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        if self.callback is not None:
+            self.callback(name, value, {} if reason is None else {"reason": reason})
+
+    def gauge(self, name: str, value: float):
+        '''
+        Sets the current value of a gauge, e.g. gauge("frontier_size", len(frontier)).
+        '''
+        with self._lock:
+            self._gauges[name] = value
+        if self.callback is not None:
+            self.callback(name, value, {})
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = {}
+            self._gauges = {}
+
+    def snapshot(self):
+        '''
+        Returns a dict with the current stages histograms, counters (failures by reason) and gauges.
+        '''
+        with self._lock:
+            counters = {}
+            for (name, reason), value in self._counters.items():
+                if reason is None:
+                    counters[name] = value
+                else:
+                    counters.setdefault(name, {})[reason] = value
+            return {
+                "stages": {stage: histogram.to_dict() for stage, histogram in self._stages.items()},
+                "counters": counters,
+                "gauges": dict(self._gauges),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix: str = "newspaper3k"):
+        '''
+        Returns the metrics in the Prometheus text exposition format.
+        '''
+        lines = []
+        with self._lock:
+            if self._stages:
+                lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for stage, histogram in self._stages.items():
+                cumulative = 0
+                for bound, n in zip(BUCKETS, histogram.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{_le(bound)}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for (counter, reason), value in self._counters.items():
+                    if counter == name:
+                        labels = "" if reason is None else f'{{reason="{reason}"}}'
+                        lines.append(f"{prefix}_{name}_total{labels} {value}")
+            for name, value in self._gauges.items():
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _le(bound: float):
+    return "+Inf" if bound == float("inf") else repr(bound)
@@ -0,0 +1,133 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError: #only needed for the async api
+    aiohttp = None
+
+FAIL_ENCODING = 'ISO-8859-1' #requests default when the server doesn't send a charset
+
+
+def request_headers(config):
+    '''
+    Headers to send with every request, same defaults as newspaper3k.
+    '''
+    return config.headers or {"User-Agent": config.browser_user_agent}
+
+
+def make_session(config, pool_connections: int = 10, pool_maxsize: int = 10):
+    '''
+    Creates a requests session that keeps connections alive and reuses them across articles.
+
+    :param config: newspaper Config, its headers and proxies are used for every request.
+    :param pool_connections: (10 by default) number of hosts to keep a connection pool for.
+    :param pool_maxsize: (10 by default) max number of connections kept open per host.
+    '''
+    session = requests.Session()
+    session.headers.update(request_headers(config))
+    if config.proxies:
+        session.proxies.update(config.proxies)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_html(session, url: str, config, cache=None, timeout: float = None):
+    '''
+    Downloads an url with the given session and decodes it the same way newspaper3k does.
+    Raises on network errors and, if config.http_success_only, on non 2XX responses.
+    If a ResponseCache is given fresh entries are served from it and stale ones revalidated with a conditional request.
+    timeout defaults to config.request_timeout.
+    '''
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry.html
+    return download_html(session, url, config, cache, entry, timeout)[0]
+
+
+def download_html(session, url: str, config, cache=None, entry=None, timeout: float = None):
+    '''
+    Same as get_html but always sends a request, conditional if entry (the stale cache entry of url) is given.
+    Returns the html and the url it was served from after redirects, the base of its relative links.
+    '''
+    timeout = config.request_timeout if timeout is None else timeout
+    response = session.get(url, headers=conditional_headers(entry), timeout=timeout, allow_redirects=True)
+    if entry is not None and response.status_code == 304: #not modified, keep the cached page
+        cache.refresh(url)
+        return entry.html, entry.url
+    if config.http_success_only:
+        response.raise_for_status()
+    html = decode_response(response)
+    if cache is not None and response.status_code == 200:
+        cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.url)
+    return html, response.url
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def decode_response(response):
+    if response.encoding != FAIL_ENCODING:
+        return response.text or ''
+    #the server didn't specify the charset, look for it in the html
+    html = response.content
+    if 'charset' not in response.headers.get('content-type', ''):
+        encodings = requests.utils.get_encodings_from_content(response.text)
+        if len(encodings) > 0:
+            response.encoding = encodings[0]
+            html = response.text
+    return html or ''
+
+
+def make_async_session(config, pool_connections: int = 10, pool_maxsize: int = 10):
+    '''
+    Creates an aiohttp session with keep alive connections, must be called from a running event loop.
+
+    :param config: newspaper Config, its headers and request_timeout are used for every request.
+    :param pool_connections: (10 by default) used to size the total number of open connections (pool_connections * pool_maxsize).
+    :param pool_maxsize: (10 by default) max number of connections open per host.
+    '''
+    if aiohttp is None:
+        raise ImportError("aiohttp is needed for the async api, install it with: pip install aiohttp")
+    connector = aiohttp.TCPConnector(limit=pool_connections*pool_maxsize, limit_per_host=pool_maxsize)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=request_headers(config),
+        timeout=aiohttp.ClientTimeout(total=config.request_timeout))
+
+
+async def aget_html(session, url: str, config, cache=None, timeout: float = None):
+    '''
+    Async version of get_html, timeout defaults to the session one.
+    '''
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry.html
+    return (await adownload_html(session, url, config, cache, entry, timeout))[0]
+
+
+async def adownload_html(session, url: str, config, cache=None, entry=None, timeout: float = None):
+    '''
+    Async version of download_html, timeout defaults to the session one.
+    '''
+    kwargs = {} if timeout is None else {"timeout": aiohttp.ClientTimeout(total=timeout)}
+    async with session.get(url, headers=conditional_headers(entry), allow_redirects=True, **kwargs) as response:
+        if entry is not None and response.status == 304:
+            cache.refresh(url)
+            return entry.html, entry.url
+        if config.http_success_only:
+            response.raise_for_status()
+        html = await response.text(errors="replace")
+        final_url = str(response.url)
+        if cache is not None and response.status == 200:
+            cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"), final_url)
+        return html, final_url
@@ -2,10 +2,108 @@ from haystack.nodes.base import BaseComponent
 from haystack.schema import Document
 from newspaper import Article
 from newspaper import Config
-from bs4 import BeautifulSoup
-import re
 from tqdm import tqdm
 import os
+import asyncio
+from .concurrency import imap_per_host, host_of, HostScheduler
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+from .network import make_session, download_html, make_async_session, adownload_html
+from .cache import ResponseCache
+from .archive import HtmlArchive, EXTENSION as ARCHIVE_EXTENSION
+from .writer import BatchWriter
+from .urls import extract_links
+from .frontier import Frontier
+from .checkpoint import CrawlCheckpoint
+from .filters import UrlFilter
+from .extraction import get_profile, parse_article
+from .languages import LanguageCache, article_nlp
+from .nlp import _nlp_texts
+from .dedup import NearDuplicateFilter
+from .resilience import RetryPolicy, HostHealth, fetch, afetch, failure_reason
+from .metrics import Metrics, timed
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+import glob
+
+_file_languages = LanguageCache(Config()) #configs of the files parsed by this process, see _load_html_files
+
+
+def _init_load(config):
+    '''
+    Process pool initializer of newspaper3k_scraper.iter_load: the files are parsed with the config of the node (profile, headers...).
+    '''
+    global _file_languages
+    _file_languages = LanguageCache(config)
+
+def article_to_dict(article, query: str, metadata: bool, links: bool, keywords: bool, summary: bool, metrics: Metrics = None):
+    '''
+    Builds the haystack document dict of an already parsed article. If metrics is given the links and nlp stages are timed.
+    '''
+    #process docs
+    document_dict = {
+        "content":article.text,
+        "content_type": "text",
+        "meta": {
+            "url":query,
+            "source_url": article.source_url,
+            "lang":article.meta_lang
+            }
+        }
+    
+    if metadata:
+        document_dict["meta"]["title"] = article.title
+        document_dict["meta"]["authors"] = article.authors
+        document_dict["meta"]["publish_date"] = article.publish_date
+        document_dict["meta"]["movies_url"] = article.movies
+        document_dict["meta"]["top_image_url"] = article.top_image
+
+    if links:
+        #reuse the dom newspaper already parsed (clean_doc is the untouched copy), relative hrefs resolved against the page url
+        with timed(metrics,"links"):
+            document_dict["meta"]["links"] = extract_links(article.clean_doc, article.url)
+
+    if keywords or summary: #this conditional is for efficiency, no need to run nlp function if we don't want the data
+        with timed(metrics,"nlp"):
+            article_nlp(article)
+    
+    if keywords:
+        document_dict["meta"]["article_keywords"] = article.keywords
+
+    if summary:
+        document_dict["meta"]["summary"] = article.summary
+
+    return document_dict
+
+
+def _load_html_files(paths: list, lang: str, metadata: bool, links: bool, keywords: bool, summary: bool, full_parse: bool = True, languages: LanguageCache = None):
+    '''
+    Process pool worker of newspaper3k_scraper.iter_load.
+    Returns a list of (path, document dict or None if no text could be extracted, True if the file couldn't be parsed,
+    title, language and summary length to run the nlp of the document later).
+    :param languages: (None by default) configs to parse the files with, if None the ones set by _init_load.
+    '''
+    languages = languages or _file_languages
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as file:
+                html = file.read()
+            article = Article(url = path, config = languages.get_config(lang))
+            article.set_html(html)
+            parse_article(article,full_parse)
+        except Exception:
+            results.append((path, None, True, None))
+            continue
+        if len(article.text) == 0:
+            results.append((path, None, False, None))
+        else:
+            nlp_args = (article.title, article.config.get_language(), article.config.MAX_SUMMARY_SENT)
+            results.append((path, article_to_dict(article,path,metadata,links,keywords,summary), False, nlp_args))
+    return results
+
+
 class newspaper3k_scraper(BaseComponent):
     '''
     A simple newspaper3k haystack node wrapper.
@@ -15,7 +113,17 @@ class newspaper3k_scraper(BaseComponent):
 
     def __init__(self,
     headers: dict = None,
-    request_timeout: int = None
+    request_timeout: int = None,
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    cache: ResponseCache = None,
+    profile: str = None,
+    languages: list = None,
+    dedup: NearDuplicateFilter = None,
+    retry: RetryPolicy = None,
+    host_health: HostHealth = None,
+    metrics: Metrics = None,
+    progress: bool = True
     ):
         """
         :param header: HTTP headers information.
@@ -24,12 +132,46 @@ class newspaper3k_scraper(BaseComponent):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'}
         
         :param request_timeout: 
+        :param pool_connections: (10 by default) Number of hosts to keep open (keep-alive) connections for.
+        :param pool_maxsize: (10 by default) Max number of open connections kept per host.
+        :param cache: (None by default) ResponseCache where downloaded pages are stored and looked up before downloading, if None no cache is used.
+        :param profile: (None by default) extraction profile, turns on the flags it needs on every scrape and skips the newspaper work it doesn't.
+            "text-only": text, title and language only, no metadata extraction and no image downloads.
+            "text+meta": metadata=True, images are not downloaded to pick the top image (the first one of the article is used).
+            "full": metadata, links, keywords and summary, newspaper defaults.
+            If None the flags are used as given and newspaper defaults apply.
+        :param languages: (None by default) languages (e.g. ["en","es"]) whose newspaper config and stopwords are loaded when the node is built
+            instead of on their first article. Every language is loaded once per node either way.
+        :param dedup: (None by default) NearDuplicateFilter the article texts are checked against before the nlp,
+            near duplicates of an already scraped article are dropped (or tagged). If None every article is returned.
+        :param retry: (None by default) RetryPolicy of downloads that fail with network errors, timeouts, 429 or 5xx. If None no retries.
+        :param host_health: (None by default) HostHealth giving each host a timeout adapted to its latency and pausing hosts that keep failing.
+        :param metrics: (None by default) Metrics recording the latency of every stage (download, parse, links, nlp, document),
+            bytes fetched, cache hits, documents and failures by reason. If None nothing is measured.
+        :param progress: (True by default) Wether to show tqdm progress bars.
         """
         self.config = Config()
         if headers != None:
             self.config.headers = headers 
         if request_timeout != None:
             self.config.request_timeout = request_timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.cache = cache
+        self.profile = None if profile is None else get_profile(profile)
+        if self.profile is not None:
+            self.config.fetch_images = self.profile["fetch_images"]
+        self.languages = LanguageCache(self.config,languages) #built after the config is complete, every language config copies it
+        self.dedup = dedup
+        self.retry = retry
+        self.host_health = host_health
+        self.metrics = metrics
+        self.progress = progress
+        self._keep_duplicates = False #the crawler needs the links of duplicates, it gets them tagged and drops them itself
+        self._archives = {}
+        #one pooled session for every article downloaded by this node
+        self.session = make_session(self.config,pool_connections,pool_maxsize)
+        self._asession = None
 
 
     def run(self, 
@@ -88,112 +230,65 @@ class newspaper3k_scraper(BaseComponent):
         :param keywords: (False by default) Wether to save the detected article keywords as document metadata.
         :param summary: (False by default) Wether to summarize the document (through nespaper3k) and save it as document metadata.
         :param path: (None by default) Path where to store the downloaded article html, if None, not downloaded. Ignored if load=True
-        :param load: (False by default) If true query should be a local path to an html file to scrape or a folder containing html files.
+            If it ends with .harc the html is appended to a single compressed archive file instead of written to a file per article.
+        :param load: (False by default) If true query should be a local path to an html file to scrape, a folder containing html files or a .harc archive.
         :param verbose_fails (True by default) If true print fail of downloads and text extractions.
         '''
+        metadata, links, keywords, summary = self._apply_profile(metadata,links,keywords,summary)
         if load:
+            if query.endswith(ARCHIVE_EXTENSION):
+                docs = list(self._iter_archive(query,lang,metadata,links,keywords,summary,verbose_fails))
+                return {"documents":docs} , "output_1"
+
             #check if path was passed 
             if os.path.isdir(query):
-                files = os.listdir("articles")
-                htmls_pths = [f for f in files if (f.split(".")[-1]=="html")] #filter only html files
-
                 docs = []
-                pbar = tqdm(total=len(htmls_pths),desc="Scraping: " + query) #tqdm bar
-                for pth in htmls_pths:
-                    #call itself but for each file
-                    docs += self.run(query+"/"+pth,lang,metadata,links,keywords,summary,load=load,verbose_fails=verbose_fails)[0]["documents"]
-                    pbar.desc = "Scraping: " + query+"/"+pth[:20]+"..."
-                    pbar.update(1)
-
+                for chunk in self.iter_load(query,lang=lang,metadata=metadata,links=links,keywords=keywords,summary=summary,verbose_fails=verbose_fails):
+                    docs += chunk
                 return {"documents":docs} , "output_1"
             
             else: #should be a simple html file or an error will be raised by nespaper3k
                 with open(query, 'rb') as file:
                     html = file.read()
-                article = Article(url = query)
+                article = self._new_article(query,lang)
                 
                 try:
-                    article.set_html(html)
-                    article.parse()
+                    with timed(self.metrics,"parse"):
+                        article.set_html(html)
+                        parse_article(article,self._full_parse(metadata))
                 except:
+                    self._count_failure("parse")
                     if verbose_fails:
                         print(f"Unable to load the file {query}")
                     return {"documents":[]} , "output_1"
 
         else: #downloading from internet
-            if lang is None:
-                article = Article(query,config=self.config)
-            else:
-                article = Article(query,language=lang,config=self.config)
+            article = self._new_article(query,lang)
             
             #try to downnload, in case of failure return empty list
             try:
-                article.download()
-                article.parse()
-            except:
+                html, article.url = self._fetch_html(query) #relative links resolve against the url after redirects
+            except Exception as error:
+                self._count_failure(failure_reason(error))
+                if verbose_fails:
+                    print(f"Unable to download the article {query}")
+                return {"documents":[]} , "output_1"
+            try:
+                with timed(self.metrics,"parse"):
+                    self._parse_html(article,html,metadata)
+            except Exception:
+                self._count_failure("parse")
                 if verbose_fails:
                     print(f"Unable to download the article {query}")
                 return {"documents":[]} , "output_1"
             
             #if wanted locally save as html file
             if path is not None:
-                assert os.path.isdir(path), f"The provided path {path} doesn't exist"
-                with open(path + "/" + query.replace("/","_")+ ".html", "w") as file:
-                    # Write to the file
-                    file.write(article.html)
-
-
-        # before continuing processing check if article parse wasn't able to get any text
-        if len(article.text) == 0 :
-            if verbose_fails:
-                print(f"Unable to extract text from {query}")
-            return {"documents":[]} , "output_1"
-        
-        #process docs
-        document_dict = {
-            "content":article.text,
-            "content_type": "text",
-            "meta": {
-                "url":query,
-                "source_url": article.source_url,
-                "lang":article.meta_lang
-                }
-            }
-        
-        if metadata:
-            document_dict["meta"]["title"] = article.title
-            document_dict["meta"]["authors"] = article.authors
-            document_dict["meta"]["publish_date"] = article.publish_date
-            document_dict["meta"]["movies_url"] = article.movies
-            document_dict["meta"]["top_image_url"] = article.top_image
-
-        if links:
-            soup = BeautifulSoup(article.html, features="lxml") #using lxml parser
-            links = list(set([link.get("href") for link in soup.findAll("a")]))
-            #some retrieved hrefs are just a subdirectory in the main page, reconstruct those.
-            clean_links = []
-            for l in links:
-                if l is not None:
-                    if("http" not in l) and ("www" not in l):
-                        clean_links.append(article.source_url + l)
-                    else:
-                        clean_links.append(l)
-
-            document_dict["meta"]["links"] = clean_links
-
-        if keywords or summary: #this conditional is for efficiency, no need to run nlp function if we don't want the data
-            article.nlp()
-        
-        if keywords:
-            document_dict["meta"]["article_keywords"] = article.keywords
-
-        if summary:
-            document_dict["meta"]["summary"] = article.summary
+                self._save_html(article,query,path)
 
-        document = Document.from_dict(document_dict)
-        
+        document = self._build_document(article,query,metadata,links,keywords,summary,verbose_fails)
         output={
-            "documents": [document],
+            "documents": [] if document is None else [document],
         }
         return output, "output_1"
 
@@ -206,7 +301,10 @@ class newspaper3k_scraper(BaseComponent):
     summary: bool = False,
     path: str = None,
     load: bool = False,
-    verbose_fails: bool = True
+    verbose_fails: bool = True,
+    workers: int = 1,
+    max_host_connections: int = None,
+    ordered: bool = True
     ):
         '''
         :param query: list of strings containing the webpages to scrape.
@@ -253,18 +351,418 @@ class newspaper3k_scraper(BaseComponent):
         :param keywords: (False by default) Wether to save the detected article keywords as document metadata.
         :param summary: (False by default) Wether to summarize the document (through nespaper3k) and save it as document metadata.
         :param path: (None by default) Path where to store the downloaded articles html, if None, not downloaded. Ignored if load=True
-        :param load: (False by default) If true query should be a local path to an html file to scrape.
+            If it ends with .harc pages are appended to a single compressed archive file.
+        :param load: (False by default) If true query should be a local path to an html file to scrape, a folder containing html files or a .harc archive.
         :param verbose_fails (True by default) If true print fail of downloads and text extractions.
+        :param workers: (1 by default) Number of articles to download concurrently. If 1 queries are scraped one after another.
+        :param max_host_connections: (None by default) Max number of concurrent downloads from the same host, if None unlimited. Only used if workers > 1.
+        :param ordered: (True by default) If true documents are returned in the same order as queries, otherwise in order of completion. Only used if workers > 1.
+        '''
+        docs = list(self.iter_run_batch(queries,lang,metadata,links,keywords,summary,path,load,verbose_fails,workers,max_host_connections,ordered))
+
+        output={
+            "documents": docs,
+        }
+        return output, "output_1"
+
+    def iter_run_batch(self,
+    queries: list,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    load: bool = False,
+    verbose_fails: bool = True,
+    workers: int = 1,
+    max_host_connections: int = None,
+    ordered: bool = True
+    ):
+        '''
+        Generator version of run_batch, yields every document as soon as it's scraped instead of keeping all of them in memory.
+        Same parameters as run_batch.
+        '''
+        if workers <= 1:
+            for web in tqdm(queries,disable=not self.progress):
+                yield from self.run(web,lang,metadata,links,keywords,summary,path,load,verbose_fails)[0]["documents"]
+        else:
+            scrape = lambda web: self.run(web,lang,metadata,links,keywords,summary,path,load,verbose_fails)[0]["documents"]
+            for _, web_docs in tqdm(imap_per_host(scrape,queries,workers,max_host_connections,ordered),total=len(queries),disable=not self.progress):
+                yield from web_docs
+
+    def iter_load(self,
+    query: str,
+    pattern: str = "**/*.html",
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    verbose_fails: bool = True,
+    workers: int = None,
+    chunk_size: int = 64
+    ):
+        '''
+        Scrapes the html files of a local folder in a pool of processes, yielding the documents in lists of at most chunk_size.
+        Files are found lazily and only a few chunks are processed at a time, so memory stays flat on very large folders.
+        :param query: folder to load the html files from.
+        :param pattern: ("**/*.html" by default) glob pattern relative to query of the files to load, ** matches any subfolder.
+        :param lang, metadata, links, keywords, summary, verbose_fails: same as in run.
+        :param workers: (None by default) number of processes, if None the number of cpus. If 1 files are parsed in this process.
+        :param chunk_size: (64 by default) number of files sent to a process at once and max size of each yielded list.
+        '''
+        metadata, links, keywords, summary = self._apply_profile(metadata,links,keywords,summary)
+        full_parse = self._full_parse(metadata)
+        #with dedup the nlp runs after the near duplicates are dropped, in a second pass over the documents left
+        defer_nlp = self.dedup is not None and (keywords or summary)
+        parse_keywords, parse_summary = (False, False) if defer_nlp else (keywords, summary)
+        workers = workers or os.cpu_count() or 1
+        paths = (pth for pth in glob.iglob(os.path.join(glob.escape(query),pattern),recursive=True) if os.path.isfile(pth))
+        chunks = iter(lambda: list(islice(paths,chunk_size)),[])
+        pbar = tqdm(desc="Scraping: " + query,unit="files",disable=not self.progress) #tqdm bar, total unknown as files are listed lazily
+
+        if workers == 1:
+            for chunk in chunks:
+                result = _load_html_files(chunk,lang,metadata,links,parse_keywords,parse_summary,full_parse,self.languages)
+                pbar.update(len(result))
+                loaded, nlp_pending = self._check_loaded(result,verbose_fails,defer_nlp)
+                if nlp_pending:
+                    with timed(self.metrics,"nlp"):
+                        self._add_nlp(nlp_pending,_nlp_texts(self._nlp_args(nlp_pending),keywords,summary))
+                yield [self._to_document(document_dict) for document_dict in loaded]
+            return
+
+        with ProcessPoolExecutor(max_workers=workers,initializer=_init_load,initargs=(self.config,)) as pool:
+            pending = deque() #futures of parsed chunks, or of the nlp of a deduplicated chunk with the chunk documents
+            for chunk in chunks:
+                pending.append((pool.submit(_load_html_files,chunk,lang,metadata,links,parse_keywords,parse_summary,full_parse), None))
+                #keep every process busy without parsing ahead of the consumer, a parsed chunk sent back for its nlp still counts
+                while len(pending) >= workers*2:
+                    yield from self._next_loaded(pending,pool,keywords,summary,defer_nlp,verbose_fails,pbar)
+            while pending:
+                yield from self._next_loaded(pending,pool,keywords,summary,defer_nlp,verbose_fails,pbar)
+
+    async def arun(self,
+    query: str,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = True
+    ):
+        '''
+        Asyncio version of run for internet queries. The page is fetched with a non blocking http client (aiohttp)
+        and the CPU bound parsing is sent to the event loop default executor.
+        Same parameters as run, except load which is not supported.
+        '''
+        metadata, links, keywords, summary = self._apply_profile(metadata,links,keywords,summary)
+        loop = asyncio.get_running_loop()
+        article = self._new_article(query,lang)
+        self._async_session() #outside the try so a missing aiohttp raises instead of failing every url
+
+        #try to downnload, in case of failure return empty list
+        try:
+            html, article.url = await self._afetch_html(query)
+        except Exception as error:
+            self._count_failure(failure_reason(error))
+            if verbose_fails:
+                print(f"Unable to download the article {query}")
+            return {"documents":[]} , "output_1"
+        try:
+            await loop.run_in_executor(None,self._timed_parse_html,article,html,metadata)
+        except Exception:
+            self._count_failure("parse")
+            if verbose_fails:
+                print(f"Unable to download the article {query}")
+            return {"documents":[]} , "output_1"
+
+        if path is not None:
+            self._save_html(article,query,path)
+
+        document = await loop.run_in_executor(None,self._build_document,article,query,metadata,links,keywords,summary,verbose_fails)
+        output={
+            "documents": [] if document is None else [document],
+        }
+        return output, "output_1"
+
+    async def arun_batch(self,
+    queries: list,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = True,
+    concurrency: int = 100,
+    ordered: bool = True
+    ):
         '''
+        Asyncio version of run_batch. Same parameters as run_batch plus:
+        :param concurrency: (100 by default) Max number of articles being fetched at the same time.
+        :param ordered: (True by default) If true documents are returned in the same order as queries, otherwise in order of completion.
+        '''
+        self._async_session() #raises if aiohttp is missing, before any task is started
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def scrape(web):
+            async with semaphore:
+                return (await self.arun(web,lang,metadata,links,keywords,summary,path,verbose_fails))[0]["documents"]
+
+        tasks = [asyncio.ensure_future(scrape(web)) for web in queries]
         docs = []
-        for web in tqdm(queries):
-            docs += self.run(web,lang,metadata,links,keywords,summary,path,load,verbose_fails)[0]["documents"]
+        for task in (tasks if ordered else asyncio.as_completed(tasks)):
+            docs += await task
 
         output={
             "documents": docs,
         }
         return output, "output_1"
 
+    def close(self):
+        '''
+        Closes the pooled http session, the node can't download anymore after this.
+        Use aclose if the async api was used.
+        '''
+        self.session.close()
+        for archive in self._archives.values():
+            archive.close()
+
+    async def aclose(self):
+        '''
+        Closes both the pooled http session and the one used by arun and arun_batch.
+        '''
+        self.close()
+        if self._asession is not None:
+            await self._asession.close()
+            self._asession = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _fetch_html(self, url: str):
+        '''
+        Returns the html of url, from the cache if it has a fresh copy, otherwise downloaded, and the url it was served from after redirects.
+        Only real downloads are timed, counted as bytes fetched and seen by the host health (cache hits would fake its latency).
+        '''
+        entry, fresh = self._cached(url)
+        if fresh:
+            return entry.html, entry.url
+        with timed(self.metrics,"download"):
+            if self.retry is None and self.host_health is None:
+                html, final_url = download_html(self.session,url,self.config,self.cache,entry)
+            else:
+                download = lambda timeout: download_html(self.session,url,self.config,self.cache,entry,timeout)
+                html, final_url = fetch(download,url,self.config.request_timeout,self.retry,self.host_health)
+        self._count_bytes(html)
+        return html, final_url
+
+    async def _afetch_html(self, url: str):
+        entry, fresh = self._cached(url)
+        if fresh:
+            return entry.html, entry.url
+        session = self._async_session()
+        with timed(self.metrics,"download"):
+            if self.retry is None and self.host_health is None:
+                html, final_url = await adownload_html(session,url,self.config,self.cache,entry)
+            else:
+                download = lambda timeout: adownload_html(session,url,self.config,self.cache,entry,timeout)
+                html, final_url = await afetch(download,url,self.config.request_timeout,self.retry,self.host_health)
+        self._count_bytes(html)
+        return html, final_url
+
+    def _async_session(self):
+        '''
+        The aiohttp session of arun, created on first use. Raises ImportError if aiohttp isn't installed.
+        '''
+        if self._asession is None or self._asession.closed:
+            self._asession = make_async_session(self.config,self.pool_connections,self.pool_maxsize)
+        return self._asession
+
+    def _cached(self, url: str):
+        '''
+        Cache entry of url (None if there is no cache or no entry) and wether it's fresh. Fresh hits are counted as cache_hits.
+        '''
+        if self.cache is None:
+            return None, False
+        entry = self.cache.get(url)
+        fresh = entry is not None and self.cache.is_fresh(entry)
+        if fresh and self.metrics is not None:
+            self.metrics.count("cache_hits")
+        return entry, fresh
+
+    def _parse_html(self, article, html: str, metadata: bool = True):
+        article.set_html(html)
+        parse_article(article,self._full_parse(metadata))
+
+    def _apply_profile(self, metadata: bool, links: bool, keywords: bool, summary: bool):
+        '''
+        Flags of a scrape with the ones the extraction profile forces turned on.
+        '''
+        if self.profile is None:
+            return metadata, links, keywords, summary
+        flags = self.profile["flags"]
+        return (metadata or flags.get("metadata",False), links or flags.get("links",False),
+            keywords or flags.get("keywords",False), summary or flags.get("summary",False))
+
+    def _full_parse(self, metadata: bool):
+        '''
+        Wether newspaper has to extract everything or just the text, title and language.
+        '''
+        return metadata or self.profile is None or self.profile["parse_meta"]
+
+    def _new_article(self, query: str, lang: str = None):
+        return Article(query,config=self.languages.get_config(lang))
+
+    def _save_html(self, article, query: str, path: str):
+        if path.endswith(ARCHIVE_EXTENSION):
+            self._archive(path).append(query,article.html)
+            return
+        assert os.path.isdir(path), f"The provided path {path} doesn't exist"
+        with open(path + "/" + query.replace("/","_")+ ".html", "w") as file:
+            # Write to the file
+            file.write(article.html)
+
+    def _archive(self, path: str):
+        if path not in self._archives:
+            self._archives.setdefault(path,HtmlArchive(path))
+        return self._archives[path]
+
+    def _iter_archive(self, path: str, lang: str, metadata: bool, links: bool, keywords: bool, summary: bool, verbose_fails: bool):
+        '''
+        Streams the documents of every page stored in a .harc archive, one record decompressed at a time.
+        '''
+        archive = self._archive(path)
+        for url, html in tqdm(archive.records(),total=len(archive),desc="Scraping: " + path,disable=not self.progress):
+            article = self._new_article(url,lang)
+            try:
+                self._timed_parse_html(article,html,metadata)
+            except:
+                self._count_failure("parse")
+                if verbose_fails:
+                    print(f"Unable to load {url} from {path}")
+                continue
+            document = self._build_document(article,url,metadata,links,keywords,summary,verbose_fails)
+            if document is not None:
+                yield document
+
+    def _next_loaded(self, pending: deque, pool, keywords: bool, summary: bool, defer_nlp: bool, verbose_fails: bool, pbar):
+        '''
+        Waits for the oldest future of iter_load. A parsed chunk is deduplicated and, if its nlp was deferred, the nlp of the documents left
+        is sent to the pool and queued last. Yields the documents of the chunk once they are complete.
+        '''
+        future, loaded = pending.popleft()
+        if loaded is not None: #nlp of a deduplicated chunk
+            loaded, nlp_pending = loaded
+            self._add_nlp(nlp_pending,future.result())
+            yield [self._to_document(document_dict) for document_dict in loaded]
+            return
+        result = future.result()
+        pbar.update(len(result))
+        loaded, nlp_pending = self._check_loaded(result,verbose_fails,defer_nlp)
+        if nlp_pending:
+            pending.append((pool.submit(_nlp_texts,self._nlp_args(nlp_pending),keywords,summary), (loaded, nlp_pending)))
+            return
+        yield [self._to_document(document_dict) for document_dict in loaded]
+
+    def _check_loaded(self, results: list, verbose_fails: bool, defer_nlp: bool = False):
+        '''
+        Document dicts of a chunk parsed by _load_html_files without the files that failed and the near duplicates (unless tagged).
+        Returns them and, if defer_nlp, the (document dict, nlp arguments) of the ones that still need their nlp (not the duplicates).
+        '''
+        loaded = []
+        nlp_pending = []
+        for path, document_dict, failed, nlp_args in results:
+            if failed:
+                self._count_failure("parse")
+                if verbose_fails:
+                    print(f"Unable to load the file {path}")
+                continue
+            if document_dict is None:
+                self._count_failure("no_text")
+                if verbose_fails:
+                    print(f"Unable to extract text from {path}")
+                continue
+            if self.dedup is not None:
+                original = self.dedup.check(document_dict["content"],path)
+                if original is not None:
+                    if not self.dedup.tag:
+                        self._count_failure("duplicate")
+                        if verbose_fails:
+                            print(f"Skipping {path}, near duplicate of {original}")
+                        continue
+                    document_dict["meta"]["duplicate_of"] = original
+                    loaded.append(document_dict) #no nlp for copies
+                    continue
+            loaded.append(document_dict)
+            if defer_nlp:
+                nlp_pending.append((document_dict, nlp_args))
+        return loaded, nlp_pending
+
+    def _nlp_args(self, nlp_pending: list):
+        return [(document_dict["content"],) + nlp_args for document_dict, nlp_args in nlp_pending]
+
+    def _add_nlp(self, nlp_pending: list, metas: list):
+        for (document_dict, _), meta in zip(nlp_pending, metas):
+            document_dict["meta"].update(meta)
+
+    def _build_document(self, article, query: str, metadata: bool, links: bool, keywords: bool, summary: bool, verbose_fails: bool):
+        '''
+        Turns an already parsed article into a haystack Document, returns None if no text could be extracted.
+        '''
+        # before continuing processing check if article parse wasn't able to get any text
+        if len(article.text) == 0 :
+            self._count_failure("no_text")
+            if verbose_fails:
+                print(f"Unable to extract text from {query}")
+            return None
+        
+        if self.dedup is not None:
+            original = self.dedup.check(article.text,query)
+            if original is not None:
+                if not (self.dedup.tag or self._keep_duplicates):
+                    self._count_failure("duplicate")
+                    if verbose_fails:
+                        print(f"Skipping {query}, near duplicate of {original}")
+                    return None
+                document_dict = article_to_dict(article,query,metadata,links,False,False,self.metrics) #no nlp for copies
+                document_dict["meta"]["duplicate_of"] = original
+                return self._to_document(document_dict)
+
+        return self._to_document(article_to_dict(article,query,metadata,links,keywords,summary,self.metrics))
+
+    def _to_document(self, document_dict: dict):
+        if self.metrics is None:
+            return Document.from_dict(document_dict)
+        with self.metrics.time("document"):
+            document = Document.from_dict(document_dict)
+        self.metrics.count("documents")
+        return document
+
+    def _timed_parse_html(self, article, html: str, metadata: bool = True):
+        with timed(self.metrics,"parse"):
+            self._parse_html(article,html,metadata)
+
+    def _count_failure(self, reason: str):
+        if self.metrics is not None:
+            self.metrics.count("failures",reason=reason)
+
+    def _count_bytes(self, html):
+        if self.metrics is not None:
+            self.metrics.count("bytes_fetched",len(html) if isinstance(html,bytes) else len(html.encode("utf-8")))
+
 class newspaper3k_crawler(BaseComponent):
     """
     A simple web crawler using newspaper3k scraper node.
@@ -273,7 +771,23 @@ class newspaper3k_crawler(BaseComponent):
 
     def __init__(self,
     headers: dict = None,
-    request_timeout: int = None
+    request_timeout: int = None,
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    cache: ResponseCache = None,
+    document_store = None,
+    write_batch_size: int = 100,
+    scorer = None,
+    seen = "hash",
+    checkpoint: str = None,
+    checkpoint_every: int = 100,
+    profile: str = None,
+    languages: list = None,
+    dedup: NearDuplicateFilter = None,
+    retry: RetryPolicy = None,
+    host_health: HostHealth = None,
+    metrics: Metrics = None,
+    progress: bool = True
     ):
         """
         :param header: HTTP headers information.(Optional, if none is passed nespaper3k default is used)
@@ -282,10 +796,42 @@ class newspaper3k_crawler(BaseComponent):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'}
         
         :param request_timeout: request timeout in seconds?* (Optional, if none is passed nespaper3k default is used)
+        :param pool_connections: (10 by default) Number of hosts to keep open (keep-alive) connections for.
+        :param pool_maxsize: (10 by default) Max number of open connections kept per host.
+        :param cache: (None by default) ResponseCache where downloaded pages are stored and looked up before downloading, if None no cache is used.
+        :param document_store: (None by default) haystack DocumentStore to write the documents to while crawling.
+            If given run and run_batch write the documents in batches as they are scraped and return an empty documents list.
+        :param write_batch_size: (100 by default) number of documents per write to document_store.
+        :param scorer: (None by default) function (url, depth) -> number to prioritize the crawl queue, lower first.
+            e.g. depth_score, HostRoundRobin() or FilterMatchScore(patterns) from newspaper3k_haystack.frontier.
+            If None urls are crawled in the order given by beam. It isn't saved in checkpoints, a resumed crawl uses the scorer of its node.
+        :param seen: ("hash" by default) how seen urls are remembered, urls are canonicalized first (no fragment, tracking parameters...).
+            "hash": exact, 64 bit fingerprints in memory.
+            "bloom": scalable bloom filter, a few bytes per url, may skip a tiny fraction of new urls.
+            "disk": exact, fingerprints in a temporary sqlite database. Use DiskSeenSet(path) to keep them in a given file across crawls.
+            Or an instance of HashSeenSet, BloomSeenSet or DiskSeenSet from newspaper3k_haystack.seen to customize them.
+        :param checkpoint: (None by default) file where the crawl state is periodically saved, so it can be continued with resume=True
+            after the process is killed. If None no checkpoints are saved.
+        :param checkpoint_every: (100 by default) number of crawled pages between checkpoints.
+        :param profile: (None by default) extraction profile of the scraper node, "text-only", "text+meta" or "full".
+        :param languages: (None by default) languages to warm up in the scraper node, e.g. ["en","es"].
+        :param dedup: (None by default) NearDuplicateFilter of the scraper node. Links of dropped duplicates are still followed
+            and they don't count towards n_articles.
+        :param retry: (None by default) RetryPolicy of the scraper node downloads.
+        :param host_health: (None by default) HostHealth of the scraper node. Urls of paused hosts are skipped
+            (held back until the host can be tried again with workers > 1), dropped hosts are skipped without any request.
+        :param metrics: (None by default) Metrics of the scraper node, the crawler also sets the frontier_size gauge.
+        :param progress: (True by default) Wether to show tqdm progress bars and the end of crawl messages.
         """
-        self.crawled_urls =[] 
-        self.stack = []
-        self.scraper_node = newspaper3k_scraper(headers,request_timeout)
+        self.document_store = document_store
+        self.write_batch_size = write_batch_size
+        self.frontier = Frontier(scorer,seen) #urls waiting to be crawled and already seen
+        self.checkpoint = CrawlCheckpoint(checkpoint) if checkpoint is not None else None
+        self.checkpoint_every = checkpoint_every
+        self._batch_index = None #position of the current seed in run_batch, saved in checkpoints
+        self._sync_output = None #waits until the documents already yielded are persisted, called before each checkpoint
+        self.scraper_node = newspaper3k_scraper(headers,request_timeout,pool_connections,pool_maxsize,cache,profile,languages,dedup,retry,host_health,metrics,progress)
+        self.scraper_node._keep_duplicates = True
 
 
     def run(self,
@@ -300,7 +846,11 @@ class newspaper3k_crawler(BaseComponent):
     keywords: bool = False,
     summary: bool = False,
     path: str = None,
-    verbose_fails: bool = False
+    verbose_fails: bool = False,
+    workers: int = 1,
+    host_delay: float = 0.0,
+    host_max_in_flight: int = 1,
+    resume: bool = False
     ):
         """
         :param query: initial url to start scraping
@@ -310,9 +860,12 @@ class newspaper3k_crawler(BaseComponent):
             If 1 then would be performing (DFS).
         :param filters: dictionary with lists of strings that the urls should contain or not. Keys: positive and negative.
             Urls will be checked to contain at least one positive filter and none of the negatives.
+            Optional keys allow_domains and deny_domains restrict the url hosts (subdomains included).
             e.g.
             {positive: [".com",".es"],
-            negative: ["facebook","instagram"]}
+            negative: ["facebook","instagram"],
+            deny_domains: ["doubleclick.net"]}
+            Can also be a newspaper3k_haystack.UrlFilter, patterns are compiled once per crawl either way.
         :param keep_links: (False by default) Wether to keep the found links in each page as document metadata or not
         :param lang: (None by default) language to process the article with, if None autodetected.
             Available languages are: (more info at https://newspaper.readthedocs.io/en/latest/)
@@ -354,59 +907,85 @@ class newspaper3k_crawler(BaseComponent):
         :param keywords: (False by default) Wether to save the detected article keywords as document metadata.
         :param summary: (False by default) Wether to summarize the document (through nespaper3k) and save it as document metadata.
         :param path: (None by default) Path where to store the downloaded articles html, if None, not downloaded.
+            If it ends with .harc pages are appended to a single compressed archive file.
         :param verbose_fails (False by default) If true print fail of downloads and text extractions.
+        :param workers: (1 by default) Number of pages downloaded at the same time. If 1 pages are crawled one after another.
+        :param host_delay: (0 by default) Min seconds between the start of two downloads from the same host. Only used if workers > 1.
+        :param host_max_in_flight: (1 by default) Max concurrent downloads from the same host. Only used if workers > 1.
+        :param resume: (False by default) If true and the node has a checkpoint of a crawl with the same query, continue it
+            from where it stopped. Documents returned before the checkpoint are not returned again.
         """
-        crawl_count = 0
-        current_seed = query
-        documents = []
-
-        pbar = tqdm(total=n_articles,desc="Crawling " + current_seed[:80]) #tqdm bar
-        while crawl_count < n_articles:
-            #scrape current seed
-            docs = self.scraper_node.run(query=current_seed,links=True,lang=lang,metadata=metadata,keywords=keywords,summary=summary,path=path,verbose_fails=verbose_fails)[0]["documents"]
+        documents = self._collect(self.iter_crawl(query,n_articles,beam,filters,keep_links,lang,metadata,links,keywords,summary,path,verbose_fails,workers,host_delay,host_max_in_flight,resume))
 
-            if len(docs) == 0: #unable to scrape
-                if verbose_fails:
-                    print("skipping to next url")
-                crawl_count -= 1 #to compensate not scraping this web
-
-            else:
-                doc = docs[0] #get article
-
-                #get links and filter them
-                links = doc.meta["links"]
-                links = self._filter_urls(links,filters=filters)
+        output={
+            "documents": documents
+        }
+        return output, "output_1"
 
-                #add found urls to pile
-                beam_slice_idx = len(self.crawled_urls)*crawl_count - len(self.crawled_urls)
-                self.stack = self.stack[:beam_slice_idx] + links[:beam] +  self.stack[beam_slice_idx:] + links[beam:]
+    def iter_crawl(self,
+    query: str,
+    n_articles: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False,
+    workers: int = 1,
+    host_delay: float = 0.0,
+    host_max_in_flight: int = 1,
+    resume: bool = False
+    ):
+        """
+        Generator version of run, yields every document as soon as its page is scraped so it can be indexed while crawling.
+        Same parameters as run.
+        """
+        state = self._load_checkpoint(query) if resume else None
+        if state is not None and state["finished"]:
+            return
+        filters = self._compile_filters(filters)
 
-                #save document
-                if not keep_links:
-                    del doc.meta["links"]
+        if workers > 1:
+            yield from self._iter_crawl_concurrent(query,n_articles,beam,filters,keep_links,lang,metadata,keywords,summary,path,verbose_fails,workers,host_delay,host_max_in_flight,state)
+            return
 
-                documents.append(doc)
+        if state is None:
+            crawl_count, emitted = 0, 0
+            current_seed, depth = query, 0
+            self.frontier.mark_seen(query)
+        else:
+            crawl_count, emitted = state["crawl_count"], state["emitted"]
+            current_seed, depth = self.frontier.pop()
+        pages = 0
 
-                #go to next webpage to crawl
-                self.crawled_urls.append(current_seed)
+        pbar = tqdm(total=n_articles,initial=emitted,desc="Crawling " + current_seed[:80],disable=not self.scraper_node.progress) #tqdm bar
+        while crawl_count < n_articles:
+            #scrape current seed
+            docs = self.scraper_node.run(query=current_seed,links=True,lang=lang,metadata=metadata,keywords=keywords,summary=summary,path=path,verbose_fails=verbose_fails)[0]["documents"]
+            doc, crawl_count = self._handle_scraped(docs,depth,crawl_count,beam,filters,keep_links,verbose_fails)
+            if doc is not None:
+                emitted += 1
+                yield doc
 
             #check if there are links left to crawl
-            if len(self.stack) == 0:
-                print(f"Unable to fulfill number of articles to scrape, didn't find enough links. Number of articles scraped: {crawl_count}")
+            if len(self.frontier) == 0:
+                if self.scraper_node.progress:
+                    print(f"Unable to fulfill number of articles to scrape, didn't find enough links. Number of articles scraped: {crawl_count}")
                 break
 
-
-            self.crawled_urls.append(current_seed) #saved scraped article, even if it didn't end up in documents because unable to download or extract text
-            current_seed = self.stack[0]
-            self.stack = self.stack[1:]
-            crawl_count += 1
+            current_seed, depth, crawl_count = self._next_seed(crawl_count)
             pbar.desc = "Crawling " + current_seed[:80] #crop url
             pbar.update(1)
 
-        output={
-            "documents": documents
-        }
-        return output, "output_1"
+            pages += 1
+            if pages % self.checkpoint_every == 0:
+                self._save_checkpoint(query,[(current_seed,depth)],crawl_count,emitted)
+
+        self._save_checkpoint(query,[],crawl_count,emitted,finished=True)
 
     def run_batch(self,
     query: list,
@@ -420,7 +999,11 @@ class newspaper3k_crawler(BaseComponent):
     keywords: bool = False,
     summary: bool = False,
     path: str = None,
-    verbose_fails: bool = False
+    verbose_fails: bool = False,
+    workers: int = 1,
+    host_delay: float = 0.0,
+    host_max_in_flight: int = 1,
+    resume: bool = False
     ):
         """
         :param query: list of initial urls to start scraping
@@ -430,9 +1013,12 @@ class newspaper3k_crawler(BaseComponent):
             If 1 then would be performing (DFS).
         :param filters: dictionary with lists of strings that the urls should contain or not. Keys: positive and negative.
             Urls will be checked to contain at least one positive filter and none of the negatives.
+            Optional keys allow_domains and deny_domains restrict the url hosts (subdomains included).
             e.g.
             {positive: [".com",".es"],
-            negative: ["facebook","instagram"]}
+            negative: ["facebook","instagram"],
+            deny_domains: ["doubleclick.net"]}
+            Can also be a newspaper3k_haystack.UrlFilter, patterns are compiled once per crawl either way.
         :param keep_links: (False by default) Wether to keep the found links in each page as document metadata or not
         :param lang: (None by default) language to process the article with, if None autodetected.
             Available languages are: (more info at https://newspaper.readthedocs.io/en/latest/)
@@ -474,55 +1060,439 @@ class newspaper3k_crawler(BaseComponent):
         :param keywords: (False by default) Wether to save the detected article keywords as document metadata.
         :param summary: (False by default) Wether to summarize the document (through nespaper3k) and save it as document metadata.
         :param path: (None by default) Path where to store the downloaded articles html, if None, not downloaded.
+            If it ends with .harc pages are appended to a single compressed archive file.
         :param verbose_fails (False by default) If true print fail of downloads and text extractions.
+        :param workers: (1 by default) Number of pages downloaded at the same time. If 1 pages are crawled one after another.
+        :param host_delay: (0 by default) Min seconds between the start of two downloads from the same host. Only used if workers > 1.
+        :param host_max_in_flight: (1 by default) Max concurrent downloads from the same host. Only used if workers > 1.
+        :param resume: (False by default) If true and the node has a checkpoint of a crawl with the same query, continue it
+            from where it stopped. Documents returned before the checkpoint are not returned again.
+        """
+
+        docs = self._collect(self.iter_crawl_batch(query,n_articles,beam,filters,keep_links,lang,metadata,links,keywords,summary,path,verbose_fails,workers,host_delay,host_max_in_flight,resume))
+
+        output={
+            "documents": docs,
+        }
+        return output, "output_1"
+
+    def iter_crawl_batch(self,
+    query: list,
+    n_articles: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False,
+    workers: int = 1,
+    host_delay: float = 0.0,
+    host_max_in_flight: int = 1,
+    resume: bool = False
+    ):
+        """
+        Generator version of run_batch, yields every document as soon as its page is scraped.
+        Same parameters as run_batch.
+        """
+        start = 0
+        if resume and self.checkpoint is not None:
+            state = self.checkpoint.load()
+            if state is not None and state["batch_index"] is not None:
+                start = state["batch_index"]
+
+        for i in range(start,len(query)):
+            self._batch_index = i
+            yield from self.iter_crawl(query[i],n_articles,beam,filters,keep_links,lang,metadata,links,keywords,summary,path,verbose_fails,workers,host_delay,host_max_in_flight,resume and i == start)
+        self._batch_index = None
+
+    def run_shard(self,
+    query,
+    n_articles: int,
+    queue,
+    shard: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False,
+    poll_interval: float = 1.0
+    ):
+        """
+        Crawls one shard of a crawl distributed across processes or machines that share the frontier through queue.
+        Each worker only scrapes urls whose host hashes to its shard and hands every link it finds to the queue,
+        which deduplicates them globally, so no page is scraped twice. Start one worker per shard, e.g. with
+        newspaper3k_haystack.distributed.crawl_sharded on one machine or by calling run_shard on each node with a RedisQueue.
+        :param query: initial url or list of urls, queued by every worker (queuing them twice has no effect).
+        :param n_articles: total number of articles to scrape across all shards.
+        :param queue: shared SQLiteQueue or RedisQueue from newspaper3k_haystack.distributed.
+        :param shard: shard of this worker, from 0 to queue.n_shards - 1.
+        :param poll_interval: (1 by default) seconds to wait for new links when the shard is empty but other workers are still crawling,
+            or for a reservation when all the articles left are being scraped by other workers.
+        Other parameters as in run.
+        """
+        documents = self._collect(self.iter_crawl_shard(query,n_articles,queue,shard,beam,filters,keep_links,lang,metadata,links,keywords,summary,path,verbose_fails,poll_interval))
+
+        output={
+            "documents": documents
+        }
+        return output, "output_1"
+
+    def iter_crawl_shard(self,
+    query,
+    n_articles: int,
+    queue,
+    shard: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False,
+    poll_interval: float = 1.0
+    ):
+        """
+        Generator version of run_shard. Same parameters as run_shard.
+        """
+        filters = self._compile_filters(filters)
+        queue.push_links([query] if isinstance(query,str) else list(query),0)
+
+        while not queue.finished(n_articles):
+            item = queue.claim(shard,n_articles)
+            if item is None:
+                if queue.idle():
+                    break #no worker has links left to crawl
+                #other shards are still crawling, links for this one may show up or a page being scraped may fail
+                time.sleep(poll_interval)
+                continue
+
+            url, depth = item
+            docs = self.scraper_node.run(query=url,links=True,lang=lang,metadata=metadata,keywords=keywords,summary=summary,path=path,verbose_fails=verbose_fails)[0]["documents"]
+            doc, _ = self._handle_scraped(docs,depth,0,beam,filters,keep_links,verbose_fails,frontier=queue)
+            #after its links are queued, so idle never sees the crawl as finished in between
+            if not queue.done(url,scraped=doc is not None) or doc is None:
+                continue #not scraped, or the lease expired and the url went back to the queue
+            yield doc
+
+    async def arun(self,
+    query: str,
+    n_articles: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False
+    ):
+        """
+        Asyncio version of run, pages are fetched through the scraper node arun so the event loop is never blocked.
+        Same parameters as run.
         """
+        filters = self._compile_filters(filters)
+        crawl_count = 0
+        current_seed, depth = query, 0
+        self.frontier.mark_seen(query)
+        documents = []
+
+        while crawl_count < n_articles:
+            docs = (await self.scraper_node.arun(query=current_seed,links=True,lang=lang,metadata=metadata,keywords=keywords,summary=summary,path=path,verbose_fails=verbose_fails))[0]["documents"]
+            doc, crawl_count = self._handle_scraped(docs,depth,crawl_count,beam,filters,keep_links,verbose_fails)
+            if doc is not None:
+                documents.append(doc)
+
+            if len(self.frontier) == 0:
+                if self.scraper_node.progress:
+                    print(f"Unable to fulfill number of articles to scrape, didn't find enough links. Number of articles scraped: {crawl_count}")
+                break
+
+            current_seed, depth, crawl_count = self._next_seed(crawl_count)
 
+        output={
+            "documents": documents
+        }
+        return output, "output_1"
+
+    async def arun_batch(self,
+    query: list,
+    n_articles: int,
+    beam: int = 0,
+    filters: list = None,
+    keep_links: bool = False,
+    lang: str = None,
+    metadata: bool = False,
+    links: bool = False,
+    keywords: bool = False,
+    summary: bool = False,
+    path: str = None,
+    verbose_fails: bool = False
+    ):
+        """
+        Asyncio version of run_batch. Same parameters as run_batch.
+        """
         docs = []
         for web in query:
-            docs += self.run(
+            docs += (await self.arun(
                     web,
                     n_articles = n_articles,
                     beam = beam,
                     filters = filters,
                     keep_links = keep_links,
-                    lang = lang, 
+                    lang = lang,
                     metadata = metadata,
                     links = links,
                     keywords = keywords,
                     summary = summary,
                     path=path,
                     verbose_fails=verbose_fails
-                    )[0]["documents"]
+                    ))[0]["documents"]
 
         output={
             "documents": docs,
         }
         return output, "output_1"
 
-    def _filter_urls(self,urls,filters):
-        #no filters
-        if filters is None:
-            return urls
+    def reset(self):
+        """
+        Empties the crawl queue and forgets the seen urls. Otherwise they are kept between runs so run_batch doesn't scrape a page twice.
+        """
+        self.frontier.clear()
+
+    def close(self):
+        """
+        Closes the pooled http session of the scraper node.
+        """
+        self.scraper_node.close()
+
+    async def aclose(self):
+        """
+        Closes the http sessions of the scraper node, including the one used by arun and arun_batch.
+        """
+        await self.scraper_node.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
 
-        #filter urls
-        pos = [re.compile(pattern) for pattern in filters["positive"]]
-        neg = [re.compile(pattern) for pattern in filters["negative"]]
-        filtered = []
-
-        for url in urls: 
-            neg_aux = False
-            if url not in self.crawled_urls and url not in self.stack: #filter to not repeat urls
-                #for a long list of neg variables this should be faster than using any()?
-                for neg_patt in neg:
-                    if neg_patt.search(url):
-                        neg_aux=True
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _iter_crawl_concurrent(self, query: str, n_articles: int, beam: int, filters: dict, keep_links: bool, lang: str, metadata: bool,
+    keywords: bool, summary: bool, path: str, verbose_fails: bool, workers: int, host_delay: float, host_max_in_flight: int, state: dict = None):
+        """
+        Crawl with several pages downloaded at once by a pool of threads, all pulling from the frontier.
+        This thread dispatches urls whose host is ready (see HostScheduler) and handles the scraped pages,
+        never more than n_articles minus the documents already scraped are in flight so exactly n_articles are returned.
+        If a checkpoint state is given the crawl continues from it.
+        """
+        scheduler = HostScheduler(host_delay,host_max_in_flight,self.scraper_node.host_health)
+        deferred = {} #host -> deque of (url, depth) popped from the frontier while the host wasn't ready
+        in_flight = {} #future -> (url, depth, host)
+        if state is None:
+            scraped = 0
+            self.frontier.mark_seen(query)
+            pending_seed = [(query,0)]
+        else:
+            scraped = state["emitted"]
+            pending_seed = []
+        pages = 0
+        scrape = lambda url: self.scraper_node.run(query=url,links=True,lang=lang,metadata=metadata,keywords=keywords,summary=summary,path=path,verbose_fails=verbose_fails)[0]["documents"]
+
+        pbar = tqdm(total=n_articles,initial=scraped,desc="Crawling " + query[:80],disable=not self.scraper_node.progress) #tqdm bar
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                #fill free workers with urls of ready hosts
+                while len(in_flight) < workers and scraped + len(in_flight) < n_articles:
+                    item = pending_seed.pop() if pending_seed else self._pop_ready(deferred,scheduler,workers)
+                    if item is None:
                         break
-                if neg_aux:
+                    url, depth = item
+                    host = host_of(url)
+                    scheduler.acquire(host)
+                    in_flight[pool.submit(scrape,url)] = (url,depth,host)
+
+                if not in_flight:
+                    if scraped >= n_articles or not deferred:
+                        break #done, or nothing left to crawl
+                    time.sleep(self._next_ready_time(deferred,scheduler)) #only hosts waiting for their delay
                     continue
 
-                for pos_patt in pos: #at least one
-                    if pos_patt.search(url):
-                        filtered.append(url)
-                        break
+                done, _ = wait(in_flight,timeout=self._next_ready_time(deferred,scheduler),return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth, host = in_flight.pop(future)
+                    scheduler.release(host)
+                    doc, _ = self._handle_scraped(future.result(),depth,0,beam,filters,keep_links,verbose_fails)
+                    if doc is not None:
+                        scraped += 1
+                        pbar.desc = "Crawling " + url[:80] #crop url
+                        pbar.update(1)
+                        yield doc
+
+                    pages += 1
+                    if pages % self.checkpoint_every == 0:
+                        #urls being scraped or held back for politeness aren't in the frontier anymore, save them apart
+                        pending = pending_seed + [(u,d) for u, d, _ in in_flight.values()] + [item for urls in deferred.values() for item in urls]
+                        self._save_checkpoint(query,pending,scraped,scraped)
+
+        self._save_checkpoint(query,[],scraped,scraped,finished=True)
+        if scraped < n_articles:
+            if self.scraper_node.progress:
+                print(f"Unable to fulfill number of articles to scrape, didn't find enough links. Number of articles scraped: {scraped}")
+
+    def _pop_ready(self, deferred: dict, scheduler: HostScheduler, max_scan: int):
+        """
+        Returns the next (url, depth) whose host is ready, or None. Urls of hosts that aren't ready are kept in deferred,
+        in frontier order, and served first once their host is ready. At most max_scan urls are moved to deferred per call.
+        """
+        for host in list(deferred):
+            if scheduler.ready(host):
+                urls = deferred[host]
+                item = urls.popleft()
+                if not urls:
+                    del deferred[host]
+                return item
+        for _ in range(max_scan):
+            if len(self.frontier) == 0:
+                return None
+            url, depth = self.frontier.pop()
+            host = host_of(url)
+            if host not in deferred and scheduler.ready(host):
+                return url, depth
+            deferred.setdefault(host,deque()).append((url,depth))
+        return None
+
+    def _next_ready_time(self, deferred: dict, scheduler: HostScheduler):
+        """
+        Seconds until one of the deferred hosts is ready, None if all of them wait for a download to finish.
+        """
+        times = [t for t in (scheduler.wait_time(host) for host in deferred) if t is not None]
+        return min(times) if times else None
+
+    def _collect(self, documents):
+        """
+        Returns the crawled documents as a list, or writes them through to the document store if the node has one.
+        """
+        if self.document_store is None:
+            return list(documents)
+        with BatchWriter(self.document_store,self.write_batch_size) as writer:
+            self._sync_output = writer.sync #checkpoints must not count documents that are still waiting to be written
+            try:
+                for doc in documents:
+                    writer.add(doc)
+            finally:
+                self._sync_output = None
+        return []
+
+    def _save_checkpoint(self, query: str, pending: list, crawl_count: int, emitted: int, finished: bool = False):
+        """
+        Saves the crawl state if the node has a checkpoint file.
+        :param pending: (url, depth) that were popped from the frontier but not scraped yet, scraped first on resume.
+        :param emitted: number of documents already returned.
+        """
+        if self.checkpoint is None:
+            return
+        if self._sync_output is not None:
+            self._sync_output()
+        self.checkpoint.save({
+            "query": query,
+            "batch_index": self._batch_index,
+            "pending": pending,
+            "crawl_count": crawl_count,
+            "emitted": emitted,
+            "frontier": self.frontier,
+            "finished": finished
+        })
+
+    def _load_checkpoint(self, query: str):
+        """
+        Restores the frontier from the checkpoint of a crawl of query, with the pending urls first in the queue.
+        Returns the saved state, None if there is none.
+        """
+        if self.checkpoint is None:
+            return None
+        state = self.checkpoint.load()
+        if state is None or state["query"] != query:
+            return None
+        state["frontier"].scorer = self.frontier.scorer #not saved in checkpoints
+        self.frontier = state["frontier"]
+        for url, depth in reversed(state["pending"]):
+            self.frontier.requeue(url,depth)
+        return state
+
+    def _handle_scraped(self, docs: list, depth: int, crawl_count: int, beam: int, filters: dict, keep_links: bool, verbose_fails: bool, frontier = None):
+        """
+        Adds the links found in a scraped page (at the given depth from the seed) to the frontier, or to the given one (e.g. a shared queue).
+        Returns the page document (None if it couldn't be scraped) and the updated crawl count.
+        """
+        if len(docs) == 0: #unable to scrape
+            if verbose_fails:
+                print("skipping to next url")
+            return None, crawl_count - 1 #to compensate not scraping this web
+
+        doc = docs[0] #get article
+
+        #get links and filter them
+        links = doc.meta["links"]
+        links = self._filter_urls(links,filters=filters)
+
+        #add found urls to the frontier, already seen ones are skipped
+        if frontier is None:
+            frontier = self.frontier
+        frontier.push_links(links,depth+1,beam)
+        if self.scraper_node.metrics is not None:
+            self.scraper_node.metrics.gauge("frontier_size",len(frontier))
+
+        #links of duplicates are followed, but the duplicate itself is not returned unless the filter tags them
+        if "duplicate_of" in doc.meta and not self.scraper_node.dedup.tag:
+            return None, crawl_count - 1
+
+        #save document
+        if not keep_links:
+            del doc.meta["links"]
+
+        return doc, crawl_count
+
+    def _next_seed(self, crawl_count: int):
+        """
+        Pops the next url to crawl from the frontier.
+        """
+        next_seed, depth = self.frontier.pop()
+        return next_seed, depth, crawl_count + 1
+
+    def _compile_filters(self, filters):
+        """
+        Compiles the filters dict once per crawl, a UrlFilter is used as is.
+        """
+        if filters is None or isinstance(filters, UrlFilter):
+            return filters
+        return UrlFilter.from_dict(filters)
+
+    def _filter_urls(self,urls,filters):
+        #no filters
+        if filters is None:
+            return urls
+        if not isinstance(filters, UrlFilter):
+            filters = self._compile_filters(filters)
 
-        return filtered
+        #filter to not repeat urls, then match the compiled patterns
+        return [url for url in urls if not self.frontier.seen(url) and filters(url)]
@@ -0,0 +1,166 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from haystack.nodes.base import BaseComponent
+from haystack.schema import Document
+from .languages import nlp_stopwords, load_tokenizer, text_nlp
+
+
+def _load_nlp(lang: str):
+    '''
+    Process pool initializer: preloads the stopwords and the sentence tokenizer once per worker.
+    '''
+    nlp_stopwords(lang)
+    load_tokenizer()
+
+
+def _nlp_texts(texts: list, keywords: bool, summary: bool):
+    '''
+    Process pool worker of newspaper3k_nlp and newspaper3k_scraper.iter_load, same as Article.nlp
+    for a list of (text, title, language, max summary sentences).
+    Returns a list of dicts with the metadata to add to each document.
+    '''
+    results = []
+    for text, title, lang, max_sents in texts:
+        text_keywords, text_summary = text_nlp(text,title,lang,max_sents,keywords,summary)
+        meta = {}
+        if keywords:
+            meta["article_keywords"] = text_keywords
+        if summary:
+            meta["summary"] = text_summary
+        results.append(meta)
+    return results
+
+
+class newspaper3k_nlp(BaseComponent):
+    '''
+    Computes the newspaper3k keywords and summary of already scraped documents in batches on a pool of processes,
+    so the scraper or crawler can run with keywords=False and summary=False and never wait for the nlp.
+    Adds the same article_keywords and summary metadata the scraper does. Summaries use the title metadata (scrape with metadata=True),
+    without it the summary is empty like in newspaper.
+    '''
+    # If it's not a decision component, there is only one outgoing edge
+    outgoing_edges = 1
+
+    def __init__(self,
+    keywords: bool = True,
+    summary: bool = True,
+    lang: str = "en",
+    workers: int = None,
+    batch_size: int = 32,
+    max_summary_sentences: int = 5
+    ):
+        '''
+        :param keywords: (True by default) Wether to save the article keywords as document metadata.
+        :param summary: (True by default) Wether to save the article summary as document metadata.
+        :param lang: ("en" by default) language of the stopwords, same codes as the scraper lang.
+        :param workers: (None by default) number of processes, if None the number of cpus. If 1 the nlp runs in this process.
+        :param batch_size: (32 by default) number of documents sent to a process at once.
+        :param max_summary_sentences: (5 by default) max number of sentences of the summaries.
+        '''
+        self.keywords = keywords
+        self.summary = summary
+        self.lang = lang
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_summary_sentences = max_summary_sentences
+        self._pool = None #started on first use, workers are kept between runs so they load everything once
+
+    def run(self,
+    documents: list,
+    keywords: bool = None,
+    summary: bool = None,
+    lang: str = None
+    ):
+        '''
+        :param documents: list of haystack Documents, updated in place.
+        :param keywords, summary, lang: (None by default) override the node settings for this run.
+        '''
+        output={
+            "documents": list(self.iter_run(documents,keywords,summary,lang)),
+        }
+        return output, "output_1"
+
+    def run_batch(self,
+    documents: list,
+    keywords: bool = None,
+    summary: bool = None,
+    lang: str = None
+    ):
+        '''
+        :param documents: list of lists of haystack Documents (or a flat list), all processed in the same batches.
+            Returned with the same nesting.
+        :param keywords, summary, lang: same as in run.
+        '''
+        if len(documents) == 0 or isinstance(documents[0], Document):
+            return self.run(documents,keywords,summary,lang)
+
+        processed = self.iter_run((doc for docs in documents for doc in docs),keywords,summary,lang)
+        output={
+            "documents": [list(islice(processed,len(docs))) for docs in documents],
+        }
+        return output, "output_1"
+
+    def iter_run(self,
+    documents,
+    keywords: bool = None,
+    summary: bool = None,
+    lang: str = None
+    ):
+        '''
+        Generator version of run, takes any iterable of documents (e.g. crawler.iter_crawl) and yields them in order once processed.
+        Only a few batches are processed ahead of the consumer.
+        '''
+        keywords = self.keywords if keywords is None else keywords
+        summary = self.summary if summary is None else summary
+        lang = lang or self.lang
+        if not (keywords or summary):
+            yield from documents
+            return
+
+        documents = iter(documents)
+        chunks = iter(lambda: list(islice(documents,self.batch_size)),[])
+        texts = lambda chunk: [(doc.content, doc.meta.get("title") or "", lang, self.max_summary_sentences) for doc in chunk]
+
+        if self.workers == 1:
+            _load_nlp(lang)
+            for chunk in chunks:
+                yield from self._annotate(chunk,_nlp_texts(texts(chunk),keywords,summary))
+            return
+
+        pool = self._get_pool()
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_nlp_texts,texts(chunk),keywords,summary)))
+            if len(pending) < self.workers*2: #keep every process busy without running far ahead of the consumer
+                continue
+            chunk, future = pending.popleft()
+            yield from self._annotate(chunk,future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from self._annotate(chunk,future.result())
+
+    def close(self):
+        '''
+        Stops the worker processes.
+        '''
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,initializer=_load_nlp,initargs=(self.lang,))
+        return self._pool
+
+    def _annotate(self, documents: list, results: list):
+        for doc, meta in zip(documents, results):
+            doc.meta.update(meta)
+            yield doc
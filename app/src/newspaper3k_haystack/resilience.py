@@ -0,0 +1,287 @@
+import time
+import random
+import asyncio
+import threading
+import requests
+from .concurrency import host_of
+
+try:
+    import aiohttp
+except ImportError: #only needed for the async api
+    aiohttp = None
+
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+    ConnectionError, TimeoutError, asyncio.TimeoutError) + ((aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) if aiohttp is not None else ())
+TIMEOUT_ERRORS = (requests.Timeout, TimeoutError, asyncio.TimeoutError)
+
+CLOSED, OPEN, HALF_OPEN, DROPPED = "closed", "open", "half-open", "dropped"
+
+
+class HostUnavailable(Exception):
+    '''
+    Raised instead of sending a request to a host whose circuit is open.
+    '''
+
+
+def _status(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) #requests
+    return status if status is not None else getattr(error, "status", None) #aiohttp
+
+
+def is_transient(error):
+    '''
+    True if a request that failed with error may work if retried: network errors, timeouts, 429 and 5xx responses.
+    '''
+    status = _status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def retry_after(error):
+    '''
+    Seconds the server asked to wait in a Retry-After header, None if it didn't.
+    '''
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError): #missing or an http date
+        return None
+
+
+class RetryPolicy:
+    '''
+    How many times and after how long a download that failed with a transient error (see is_transient) is retried.
+    Waits follow an exponential backoff with full jitter (random between 0 and backoff * 2^attempt), or the server Retry-After.
+    '''
+
+    def __init__(self, retries: int = 2, backoff: float = 0.5, max_backoff: float = 30.0):
+        '''
+        :param retries: (2 by default) max number of retries of a download.
+        :param backoff: (0.5 by default) seconds of the first backoff, doubled on every retry.
+        :param max_backoff: (30 by default) max seconds to wait before a retry.
+        '''
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt: int, error = None):
+        '''
+        Seconds to wait before retrying after the given attempt (0 the first) failed with error.
+        '''
+        asked = retry_after(error) if error is not None else None
+        if asked is not None:
+            return min(asked, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class _Host:
+
+    def __init__(self):
+        self.srtt = None #smoothed latency
+        self.rttvar = 0.0 #latency variation
+        self.failures = 0 #consecutive transient failures
+        self.state = CLOSED
+        self.opened = 0.0 #when the circuit opened
+        self.trips = 0 #times the circuit opened
+        self.trial = False #half open request in flight
+
+
+class HostHealth:
+    '''
+    Per host memory of downloads, shared by all the requests of a node. Thread safe.
+    Adaptive timeouts: the timeout of a host is its smoothed latency plus 4 times its variation (like TCP retransmission timeouts),
+    between min_timeout and the configured request_timeout, and doubles after a timeout.
+    Circuit breaker: after failure_threshold transient failures in a row the host is paused for cooldown seconds, then one trial request
+    is let through: if it works the host is back, if not it's paused again. A host that trips max_trips times is dropped for good.
+    '''
+
+    def __init__(self,
+    failure_threshold: int = 5,
+    cooldown: float = 30.0,
+    max_trips: int = 3,
+    adaptive_timeout: bool = True,
+    min_timeout: float = 2.0
+    ):
+        '''
+        :param failure_threshold: (5 by default) consecutive transient failures that open the circuit of a host.
+        :param cooldown: (30 by default) seconds a host is paused once its circuit opens.
+        :param max_trips: (3 by default) times the circuit of a host can open before the host is dropped, if None never dropped.
+        :param adaptive_timeout: (True by default) wether to derive the timeout of each host from its latency.
+        :param min_timeout: (2 by default) min seconds of an adaptive timeout.
+        '''
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.adaptive_timeout = adaptive_timeout
+        self.min_timeout = min_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, host: str, default: float):
+        '''
+        Timeout of the next request to host, default is the max (the configured request_timeout).
+        '''
+        stats = self._hosts.get(host)
+        if not self.adaptive_timeout or stats is None or stats.srtt is None:
+            return default
+        return min(default, max(self.min_timeout, stats.srtt + 4 * stats.rttvar))
+
+    def allow(self, host: str):
+        '''
+        True if a request to host can be sent now, in half open state only the first caller gets to send the trial request.
+        '''
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None or stats.state == CLOSED:
+                return True
+            if stats.state == OPEN and time.monotonic() - stats.opened >= self.cooldown:
+                stats.state = HALF_OPEN
+            if stats.state == HALF_OPEN and not stats.trial:
+                stats.trial = True
+                return True
+            return False
+
+    def cooldown_left(self, host: str):
+        '''
+        Seconds until host can be tried again, 0 if it can be now or if it's dropped (its requests fail right away).
+        '''
+        stats = self._hosts.get(host)
+        if stats is None or stats.state != OPEN:
+            return 0.0
+        return max(0.0, stats.opened + self.cooldown - time.monotonic())
+
+    def state(self, host: str):
+        stats = self._hosts.get(host)
+        return CLOSED if stats is None else stats.state
+
+    def success(self, host: str, latency: float):
+        '''
+        Records a request to host that got a response after latency seconds.
+        '''
+        with self._lock:
+            stats = self._stats(host)
+            if stats.srtt is None:
+                stats.srtt, stats.rttvar = latency, latency / 2
+            else:
+                stats.rttvar = 0.75 * stats.rttvar + 0.25 * abs(stats.srtt - latency)
+                stats.srtt = 0.875 * stats.srtt + 0.125 * latency
+            stats.failures = 0
+            stats.trial = False
+            if stats.state != DROPPED:
+                stats.state = CLOSED
+
+    def failure(self, host: str, timeout: bool = False):
+        '''
+        Records a request to host that failed with a transient error, timeout if it timed out.
+        '''
+        with self._lock:
+            stats = self._stats(host)
+            if timeout and stats.srtt is not None:
+                stats.srtt *= 2 #give the next attempt more time
+            stats.failures += 1
+            stats.trial = False
+            if stats.state == HALF_OPEN or (stats.state == CLOSED and stats.failures >= self.failure_threshold):
+                stats.trips += 1
+                stats.opened = time.monotonic()
+                stats.state = DROPPED if self.max_trips is not None and stats.trips >= self.max_trips else OPEN
+
+    def cancel(self, host: str):
+        '''
+        Records a request to host that was cancelled before it got an answer, a half open host lets another trial request through.
+        '''
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is not None:
+                stats.trial = False
+
+    def _stats(self, host: str):
+        if host not in self._hosts:
+            self._hosts[host] = _Host()
+        return self._hosts[host]
+
+
+def fetch(download, url: str, timeout: float, retry: RetryPolicy = None, health: HostHealth = None):
+    '''
+    Calls download(timeout) retrying transient errors as given by retry, with the timeout and circuit breaker of health.
+    Raises HostUnavailable if the host of url is paused or dropped, otherwise the last error.
+    '''
+    host = host_of(url)
+    attempt = 0
+    while True:
+        if health is not None and not health.allow(host):
+            raise HostUnavailable(f"{host} is not responding, skipping {url}")
+        start = time.monotonic()
+        try:
+            result = download(health.timeout(host,timeout) if health is not None else timeout)
+        except Exception as error:
+            if not _record_error(health, host, error, time.monotonic() - start) or retry is None or attempt >= retry.retries:
+                raise
+            time.sleep(retry.delay(attempt,error))
+            attempt += 1
+            continue
+        except BaseException: #cancelled (e.g. asyncio.CancelledError), the host must not wait for a trial that will never end
+            if health is not None:
+                health.cancel(host)
+            raise
+        if health is not None:
+            health.success(host,time.monotonic() - start)
+        return result
+
+
+async def afetch(download, url: str, timeout: float, retry: RetryPolicy = None, health: HostHealth = None):
+    '''
+    Async version of fetch, download(timeout) returns an awaitable.
+    '''
+    host = host_of(url)
+    attempt = 0
+    while True:
+        if health is not None and not health.allow(host):
+            raise HostUnavailable(f"{host} is not responding, skipping {url}")
+        start = time.monotonic()
+        try:
+            result = await download(health.timeout(host,timeout) if health is not None else timeout)
+        except Exception as error:
+            if not _record_error(health, host, error, time.monotonic() - start) or retry is None or attempt >= retry.retries:
+                raise
+            await asyncio.sleep(retry.delay(attempt,error))
+            attempt += 1
+            continue
+        except BaseException: #cancelled (e.g. asyncio.CancelledError), the host must not wait for a trial that will never end
+            if health is not None:
+                health.cancel(host)
+            raise
+        if health is not None:
+            health.success(host,time.monotonic() - start)
+        return result
+
+
+def _record_error(health: HostHealth, host: str, error: Exception, latency: float):
+    '''
+    Records a failed request in health and returns wether the error is transient.
+    '''
+    transient = is_transient(error)
+    if health is not None:
+        if transient:
+            health.failure(host,isinstance(error,TIMEOUT_ERRORS))
+        else: #the host answered (e.g. a 404), it's up
+            health.success(host,latency)
+    return transient
+
+
+def failure_reason(error):
+    '''
+    Short label of why a download failed, e.g. for metrics.
+    '''
+    if isinstance(error, HostUnavailable):
+        return "host_unavailable"
+    status = _status(error)
+    if status is not None:
+        return f"http_{status}"
+    if isinstance(error, TIMEOUT_ERRORS):
+        return "timeout"
+    if isinstance(error, TRANSIENT_ERRORS):
+        return "connection"
+    return type(error).__name__
@@ -0,0 +1,287 @@
+import os
+import math
+import shutil
+import sqlite3
+import weakref
+import tempfile
+import hashlib
+import threading
+from array import array
+from .urls import canonicalize_url
+
+
+def fingerprint(url: str, canonicalize: bool = True):
+    '''
+    64 bit fingerprint of an url (signed, so it fits a sqlite INTEGER), canonicalized first by default.
+    '''
+    if canonicalize:
+        url = canonicalize_url(url)
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class HashSeenSet:
+    '''
+    Exact set of seen urls storing 64 bit fingerprints instead of the url strings.
+    Collisions are possible but negligible below billions of urls.
+    '''
+
+    def __init__(self, canonicalize: bool = True):
+        '''
+        :param canonicalize: (True by default) canonicalize urls before fingerprinting them, see urls.canonicalize_url.
+        '''
+        self.canonicalize = canonicalize
+        self._fingerprints = set()
+        self.journal_path = None #see journal
+        self._journaled = 0 #fingerprints already in the journal
+        self._unsaved = [] #fingerprints added since the last pickling, only kept with a journal
+
+    def add(self, url: str):
+        '''
+        Adds url, returns True if it wasn't seen before.
+        '''
+        key = fingerprint(url, self.canonicalize)
+        if key in self._fingerprints:
+            return False
+        self._fingerprints.add(key)
+        if self.journal_path is not None:
+            self._unsaved.append(key)
+        return True
+
+    def journal(self, path: str):
+        '''
+        Makes pickling incremental (e.g. crawl checkpoints): fingerprints are appended to the file path, each pickling only writes
+        the ones added since the previous one and the pickle only keeps the path and how many fingerprints of the file are valid.
+        '''
+        self.journal_path = path
+        self._journaled = 0
+        self._unsaved = list(self._fingerprints)
+        open(path, "wb").close()
+
+    def __contains__(self, url: str):
+        return fingerprint(url, self.canonicalize) in self._fingerprints
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def clear(self):
+        self._fingerprints = set()
+        if self.journal_path is not None:
+            self.journal(self.journal_path)
+
+    def __getstate__(self):
+        if self.journal_path is None:
+            return self.__dict__
+        with open(self.journal_path, "ab") as file:
+            file.write(array("q", self._unsaved).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        self._journaled += len(self._unsaved)
+        self._unsaved = []
+        return {"canonicalize": self.canonicalize, "journal_path": self.journal_path, "journaled": self._journaled}
+
+    def __setstate__(self, state):
+        if "_fingerprints" in state:
+            self.__dict__.update(state)
+            return
+        self.__init__(state["canonicalize"])
+        size = state["journaled"] * array("q").itemsize
+        fingerprints = array("q")
+        with open(state["journal_path"], "r+b") as file:
+            fingerprints.frombytes(file.read(size))
+            file.truncate(size) #drop what a pickling that didn't complete (e.g. a killed checkpoint save) appended
+        self._fingerprints = set(fingerprints)
+        self.journal_path = state["journal_path"]
+        self._journaled = state["journaled"]
+
+
+class _BloomFilter:
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.count = 0
+        self.n_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2)**2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def positions(self, digest: bytes):
+        #double hashing, k positions out of two 64 bit hashes
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i*h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def __contains__(self, positions: list):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, positions: list):
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class BloomSeenSet:
+    '''
+    Scalable bloom filter of seen urls: fixed memory per url (a few bytes) whatever the url length.
+    May wrongly report an url as seen with probability about error_rate (so a few pages may be skipped),
+    never the other way around. When a filter is full a new one twice as big and with a tighter error rate is added.
+    '''
+
+    def __init__(self,
+    capacity: int = 1000000,
+    error_rate: float = 1e-4,
+    canonicalize: bool = True
+    ):
+        '''
+        :param capacity: (1M by default) number of urls the first filter is sized for.
+        :param error_rate: (1e-4 by default) target false positive probability.
+        :param canonicalize: (True by default) canonicalize urls before hashing them, see urls.canonicalize_url.
+        '''
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.canonicalize = canonicalize
+        self.clear()
+
+    def add(self, url: str):
+        '''
+        Adds url, returns True if it wasn't seen before.
+        '''
+        digest = self._digest(url)
+        if self._contains(digest):
+            return False
+        last = self._filters[-1]
+        if last.count >= last.capacity:
+            #tightening ratio 0.5 keeps the total error rate under 2 * error_rate
+            last = _BloomFilter(last.capacity * 2, self.error_rate * 0.5**len(self._filters))
+            self._filters.append(last)
+        last.add(last.positions(digest))
+        return True
+
+    def __contains__(self, url: str):
+        return self._contains(self._digest(url))
+
+    def __len__(self):
+        return sum(f.count for f in self._filters)
+
+    def clear(self):
+        self._filters = [_BloomFilter(self.capacity, self.error_rate)]
+
+    def _digest(self, url: str):
+        if self.canonicalize:
+            url = canonicalize_url(url)
+        return hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+
+    def _contains(self, digest: bytes):
+        return any(f.positions(digest) in f for f in self._filters)
+
+
+class DiskSeenSet:
+    '''
+    Exact set of seen url fingerprints stored in a sqlite database, for crawls that don't fit in memory.
+    If a path is given the database persists, so it can also be shared with a later run, otherwise it's a temporary file
+    deleted on close (crawl checkpoints move it next to the checkpoint file instead, see move).
+    Pickling (e.g. checkpoints) keeps the path and how many urls were added, unpickling reopens the database
+    and forgets the urls added after the pickling.
+    '''
+
+    def __init__(self, path: str = None, canonicalize: bool = True):
+        '''
+        :param path: (None by default) sqlite database file, urls already in it count as seen. If None a new temporary file.
+        :param canonicalize: (True by default) canonicalize urls before fingerprinting them, see urls.canonicalize_url.
+        '''
+        self._cleanup = None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="seen_urls_", suffix=".sqlite3")
+            os.close(fd)
+            self._cleanup = weakref.finalize(self, _remove_database, path)
+        self.canonicalize = canonicalize
+        self._lock = threading.Lock()
+        self._open(path)
+
+    def _open(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        #rows are numbered in insertion order so an unpickled copy can drop the ones added after the pickling
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY, fingerprint INTEGER UNIQUE)")
+
+    @property
+    def temporary(self):
+        '''
+        True if the database is deleted on close.
+        '''
+        return self._cleanup is not None and self._cleanup.alive
+
+    def add(self, url: str):
+        '''
+        Adds url, returns True if it wasn't seen before.
+        '''
+        with self._lock:
+            cursor = self._db.execute("INSERT OR IGNORE INTO seen (fingerprint) VALUES (?)", (fingerprint(url, self.canonicalize),))
+            return cursor.rowcount == 1
+
+    def __contains__(self, url: str):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM seen WHERE fingerprint=?", (fingerprint(url, self.canonicalize),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM seen")
+
+    def move(self, path: str):
+        '''
+        Moves the database to the file path (replaced if it exists), a temporary database isn't deleted on close anymore.
+        '''
+        with self._lock:
+            self._db.close()
+            _remove_database(path)
+            shutil.move(self.path, path)
+            _remove_database(self.path) #wal files left by other connections
+            if self._cleanup is not None:
+                self._cleanup.detach()
+                self._cleanup = None
+            self._open(path)
+
+    def close(self):
+        self._db.close()
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def __getstate__(self):
+        #the database is already on disk, only where it is and its last row are kept, the copy doesn't delete it
+        with self._lock:
+            rows = self._db.execute("SELECT MAX(id) FROM seen").fetchone()[0] or 0
+        return {"path": self.path, "canonicalize": self.canonicalize, "rows": rows}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["canonicalize"])
+        with self._lock:
+            self._db.execute("DELETE FROM seen WHERE id > ?", (state["rows"],))
+
+
+def _remove_database(path: str):
+    for file in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(file):
+            os.remove(file)
+
+
+SEEN_BACKENDS = {
+    "hash": HashSeenSet,
+    "bloom": BloomSeenSet,
+    "disk": DiskSeenSet,
+}
+
+
+def make_seen_set(seen = "hash"):
+    '''
+    Returns a seen set from a backend name ("hash", "bloom" or "disk", with default settings, "disk" in a new temporary file)
+    or an already built one.
+    '''
+    if isinstance(seen, str):
+        if seen not in SEEN_BACKENDS:
+            raise ValueError(f"Unknown seen set backend {seen}, available: {list(SEEN_BACKENDS)}")
+        return SEEN_BACKENDS[seen]()
+    return seen
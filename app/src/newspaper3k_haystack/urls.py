@@ -0,0 +1,63 @@
+from urllib.parse import urlsplit, urlunsplit, urljoin, urldefrag, parse_qsl, urlencode
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+#query parameters that only track where the visit came from, they don't change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "ref_src"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def normalize_url(url: str):
+    '''
+    Returns a normalized version of url so that trivially different spellings of the same page match:
+    lowercase scheme and host, no default port, no fragment and "/" as path if empty.
+    '''
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host += ":" + str(parts.port)
+    if parts.username or parts.password:
+        host = parts.netloc.rsplit("@", 1)[0] + "@" + host
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+
+def canonicalize_url(url: str):
+    '''
+    Returns the canonical form of url used to tell if a page was already seen. On top of normalize_url:
+    http and https are considered the same, tracking query parameters (utm_*, fbclid, gclid...) are dropped,
+    the remaining ones sorted and trailing slashes removed. Meant as a dedup key, not to be downloaded.
+    '''
+    parts = urlsplit(normalize_url(url))
+    scheme = "https" if parts.scheme == "http" else parts.scheme
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, parts.netloc, path, urlencode(sorted(query)), ""))
+
+def extract_links(doc, base_url: str):
+    '''
+    Returns the absolute http(s) urls linked from an already parsed lxml document, de-duplicated and in document order.
+    Relative hrefs are resolved against the <base href> of the page if it has one, otherwise against base_url.
+
+    :param doc: lxml document, e.g. newspaper's article.clean_doc.
+    :param base_url: url the page was downloaded from.
+    '''
+    if doc is None:
+        return []
+    base_hrefs = doc.xpath("//base/@href")
+    if base_hrefs:
+        base_url = urljoin(base_url, base_hrefs[0].strip())
+    links = {}
+    for href in doc.xpath("//a/@href"):
+        href = href.strip()
+        if not href or href.startswith("#"):
+            continue
+        try:
+            url = urldefrag(urljoin(base_url, href))[0]
+        except ValueError: #malformed urls, e.g. invalid ipv6 hosts
+            continue
+        if url.startswith(("http://", "https://")):
+            links[url] = None
+    return list(links)
@@ -0,0 +1,85 @@
+import queue
+import threading
+
+
+class BatchWriter:
+    '''
+    Writes documents to a haystack DocumentStore in batches from a background thread,
+    so crawling and indexing overlap. At most one batch waits to be written while the next one is filled,
+    if the store is slower than the crawl add blocks instead of piling up documents in memory.
+    '''
+
+    def __init__(self, document_store, batch_size: int = 100):
+        '''
+        :param document_store: haystack DocumentStore to write to.
+        :param batch_size: (100 by default) number of documents per write_documents call.
+        '''
+        self.document_store = document_store
+        self.batch_size = batch_size
+        self.written = 0
+        self._batch = []
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def add(self, document):
+        self._batch.append(document)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Hands the current batch to the writer thread.
+        '''
+        self._raise_error()
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def sync(self):
+        '''
+        Hands the current batch to the writer thread and waits until everything added so far is written.
+        '''
+        self.flush()
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        '''
+        Writes the remaining documents and waits for the writer thread to finish. Raises any error from the store.
+        '''
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else: #don't hide the original error, just stop the thread
+            self._batch = []
+            self._queue.put(None)
+            self._thread.join()
+
+    def _write_loop(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                self._queue.task_done()
+                return
+            try:
+                if self._error is None: #otherwise keep draining so add doesn't block forever, the error is raised on the next flush
+                    self.document_store.write_documents(batch)
+                    self.written += len(batch)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
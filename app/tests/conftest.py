@@ -0,0 +1,22 @@
+import pytest
+from haystack.schema import Document
+
+
+@pytest.fixture
+def fake_site():
+    '''
+    Factory of a replacement for newspaper3k_scraper.run serving pages from a dict url -> list of links
+    instead of downloading them. Pages not in the dict can't be scraped. The returned function records the scraped urls in .scraped.
+    '''
+    def make(pages: dict, fail: set = ()):
+        def run(query, links=False, **kwargs):
+            run.scraped.append(query)
+            if query not in pages or query in fail:
+                return {"documents": []}, "output_1"
+            meta = {"url": query}
+            if links:
+                meta["links"] = list(pages[query])
+            return {"documents": [Document(content=f"text of {query}", meta=meta)]}, "output_1"
+        run.scraped = []
+        return run
+    return make
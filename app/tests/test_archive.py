@@ -0,0 +1,41 @@
+from newspaper3k_haystack import HtmlArchive
+
+
+def test_index_rebuilt_if_missing(tmp_path):
+    archive = HtmlArchive(str(tmp_path / "pages.harc"))
+    archive.append("http://a.com/1", "<html>1</html>")
+    archive.append("http://a.com/2", "<html>2</html>")
+    archive.close()
+    (tmp_path / "pages.harc.idx").unlink()
+
+    reopened = HtmlArchive(str(tmp_path / "pages.harc"))
+    assert len(reopened) == 2
+    assert reopened.get("http://a.com/2") == b"<html>2</html>"
+
+
+def test_index_completed_after_crash_between_record_and_index_line(tmp_path):
+    archive = HtmlArchive(str(tmp_path / "pages.harc"))
+    archive.append("http://a.com/1", "<html>1</html>")
+    archive.append("http://a.com/2", "<html>2</html>")
+    archive.close()
+    index_path = tmp_path / "pages.harc.idx"
+    lines = index_path.read_text().splitlines(keepends=True)
+    index_path.write_text(lines[0] + lines[1][:5]) #second index line lost half way
+
+    reopened = HtmlArchive(str(tmp_path / "pages.harc"))
+    assert "http://a.com/2" in reopened
+    assert len(reopened) == 2
+    assert reopened.get("http://a.com/2") == b"<html>2</html>"
+    assert HtmlArchive(str(tmp_path / "pages.harc")).index() == reopened.index() #index file repaired
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = tmp_path / "pages.harc"
+    archive = HtmlArchive(str(path))
+    archive.append("http://a.com/1", "<html>1</html>")
+    archive.append("http://a.com/2", "<html>2</html>")
+    archive.close()
+    path.write_bytes(path.read_bytes()[:-3])
+    (tmp_path / "pages.harc.idx").unlink()
+
+    assert list(HtmlArchive(str(path)).index()) == ["http://a.com/1"]
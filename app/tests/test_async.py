@@ -0,0 +1,15 @@
+import sys
+import asyncio
+import pytest
+from newspaper3k_haystack import newspaper3k_scraper
+
+network = sys.modules["newspaper3k_haystack.network"]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_missing_aiohttp_raises(monkeypatch, batch):
+    monkeypatch.setattr(network, "aiohttp", None)
+    scraper = newspaper3k_scraper(progress=False)
+    scrape = scraper.arun_batch(["http://a.com/1", "http://a.com/2"]) if batch else scraper.arun("http://a.com/1")
+    with pytest.raises(ImportError, match="aiohttp"):
+        asyncio.run(scrape)
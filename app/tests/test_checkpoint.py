@@ -0,0 +1,82 @@
+import os
+import gc
+import pytest
+from newspaper3k_haystack import DiskSeenSet, newspaper3k_crawler
+from newspaper3k_haystack.checkpoint import CrawlCheckpoint
+
+
+def chain(n: int):
+    #page i links to page i+1
+    return {f"http://a.com/{i}": [f"http://a.com/{i + 1}"] for i in range(n)}
+
+
+def test_lambda_scorer_checkpoint_and_resume(tmp_path, fake_site):
+    path = str(tmp_path / "crawl.ckpt")
+    crawler = newspaper3k_crawler(scorer=lambda url, depth: depth, checkpoint=path, checkpoint_every=2, progress=False)
+    crawler.scraper_node.run = fake_site(chain(10))
+    docs = crawler.run(query="http://a.com/0", n_articles=4, verbose_fails=False)[0]["documents"]
+    assert len(docs) == 4
+
+    resumed = newspaper3k_crawler(scorer=lambda url, depth: -depth, checkpoint=path, checkpoint_every=2, progress=False)
+    resumed.scraper_node.run = fake_site(chain(10))
+    state = resumed._load_checkpoint("http://a.com/0")
+    assert resumed.frontier.scorer(None, 3) == -3
+    assert state["crawl_count"] == 4
+
+
+def test_seen_urls_saved_incrementally(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "crawl.ckpt"))
+    crawler = newspaper3k_crawler(progress=False)
+    crawler.frontier.push_links([f"http://a.com/{i}" for i in range(100)], 1)
+    checkpoint.save({"frontier": crawler.frontier})
+    size = os.path.getsize(checkpoint.seen_path)
+    crawler.frontier.push_links(["http://a.com/0", "http://a.com/100"], 1)
+    checkpoint.save({"frontier": crawler.frontier})
+    assert os.path.getsize(checkpoint.seen_path) == size + 8 #only the new url was appended
+
+    frontier = checkpoint.load()["frontier"]
+    assert len(frontier.seen_set) == 101 and frontier.seen("http://a.com/100")
+
+
+def test_seen_urls_of_an_interrupted_save_are_dropped(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "crawl.ckpt"))
+    crawler = newspaper3k_crawler(progress=False)
+    crawler.frontier.push_links(["http://a.com/1"], 1)
+    checkpoint.save({"frontier": crawler.frontier})
+    crawler.frontier.push_links(["http://a.com/2"], 1)
+    with open(checkpoint.seen_path, "ab") as file:
+        file.write(b"\x01" * 8) #journal appended but the checkpoint file never replaced
+
+    frontier = checkpoint.load()["frontier"]
+    assert len(frontier.seen_set) == 1
+    assert os.path.getsize(checkpoint.seen_path) == 8
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.mark.parametrize("seen", ["hash", "bloom", "disk", "disk path"])
+def test_resume_crawl_after_a_crash(tmp_path, fake_site, seen):
+    path = str(tmp_path / "crawl.ckpt")
+    pages = {url: links + ["http://a.com/0"] for url, links in chain(20).items()} #links back home must stay seen
+    if seen == "disk path":
+        seen = lambda: DiskSeenSet(str(tmp_path / "seen.sqlite3"))
+    else:
+        seen = lambda seen=seen: seen
+    crawler = newspaper3k_crawler(seen=seen(), checkpoint=path, checkpoint_every=3, progress=False)
+    run = fake_site(pages)
+    def crash_after_5(query, **kwargs):
+        if len(run.scraped) == 5:
+            raise Killed()
+        return run(query, **kwargs)
+    crawler.scraper_node.run = crash_after_5
+    with pytest.raises(Killed):
+        crawler.run(query="http://a.com/0", n_articles=10, verbose_fails=False)
+    del crawler #a temporary disk seen set is cleaned up with its crawler
+    gc.collect()
+
+    resumed = newspaper3k_crawler(seen=seen(), checkpoint=path, checkpoint_every=3, progress=False)
+    resumed.scraper_node.run = fake_site(pages)
+    docs = resumed.run(query="http://a.com/0", n_articles=10, verbose_fails=False, resume=True)[0]["documents"]
+    assert [doc.meta["url"] for doc in docs] == [f"http://a.com/{i}" for i in range(3, 10)]
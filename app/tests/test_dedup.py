@@ -0,0 +1,52 @@
+import sys
+from unittest import mock
+import pytest
+from newspaper3k_haystack import newspaper3k_scraper, NearDuplicateFilter
+
+nlp_module = sys.modules["newspaper3k_haystack.nlp"]
+
+STORY = "The council approved the new budget for the city schools after a long debate on Tuesday night. " * 20
+
+
+def write_pages(folder):
+    pages = {"a": STORY, "b": STORY + " Updated.", "c": "A completely different story about the weather in the mountains this week. " * 20}
+    for name, text in pages.items():
+        (folder / f"{name}.html").write_text(f"<html><head><title>{name}</title></head><body><article><p>{text}</p></article></body></html>")
+
+
+@pytest.mark.parametrize("tag", [False, True])
+def test_folder_duplicates_skip_nlp(tmp_path, tag):
+    write_pages(tmp_path)
+    scraper = newspaper3k_scraper(dedup=NearDuplicateFilter(tag=tag), progress=False)
+    with mock.patch.object(nlp_module, "text_nlp", wraps=nlp_module.text_nlp) as text_nlp:
+        #workers=1 so the nlp runs in this process and can be counted
+        docs = [doc for chunk in scraper.iter_load(str(tmp_path), workers=1, keywords=True) for doc in chunk]
+    assert text_nlp.call_count == 2
+    assert len(docs) == (3 if tag else 2)
+    assert sum("article_keywords" in doc.meta for doc in docs) == 2
+    assert all("article_keywords" not in doc.meta for doc in docs if "duplicate_of" in doc.meta)
+
+
+def test_folder_duplicates_dropped_with_nlp_in_pool(tmp_path):
+    write_pages(tmp_path)
+    scraper = newspaper3k_scraper(dedup=NearDuplicateFilter(), progress=False)
+    docs = [doc for chunk in scraper.iter_load(str(tmp_path), workers=2, chunk_size=1, keywords=True) for doc in chunk]
+    assert len(docs) == 2
+    assert all(doc.meta["article_keywords"] for doc in docs)
+
+
+def test_pool_bound_holds_with_deferred_nlp(tmp_path):
+    words = [f"word{i}" for i in range(2000)]
+    for i in range(30):
+        text = " ".join(f"The {word} story was reported by the city paper on Tuesday." for word in words[i*60:(i + 1)*60])
+        (tmp_path / f"{i}.html").write_text(f"<html><head><title>{i}</title></head><body><article><p>{text}</p></article></body></html>")
+    scraper = newspaper3k_scraper(dedup=NearDuplicateFilter(), progress=False)
+    sizes = []
+    next_loaded = scraper._next_loaded
+    def record(pending, *args):
+        sizes.append(len(pending))
+        return next_loaded(pending, *args)
+    scraper._next_loaded = record
+    docs = [doc for chunk in scraper.iter_load(str(tmp_path), workers=2, chunk_size=1, keywords=True) for doc in chunk]
+    assert len(docs) == 30
+    assert max(sizes) <= 4
@@ -0,0 +1,94 @@
+import time
+import threading
+from newspaper3k_haystack import SQLiteQueue, newspaper3k_crawler
+from newspaper3k_haystack.distributed import shard_of
+
+
+def test_sqlite_push_links_beam_skips_seen_links(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "frontier.sqlite3"), 1)
+    queue.push_links(["http://a.com/"], 0)
+    assert queue.claim(0) == ("http://a.com/", 0)
+    assert queue.push_links(["http://a.com/", "http://a.com/1", "http://a.com/2"], 1, beam=1) == 2
+    assert queue.push_links(["http://a.com/", "http://a.com/1", "http://a.com/3", "http://a.com/3"], 2, beam=1) == 1
+    assert [queue.claim(0)[0] for _ in range(3)] == ["http://a.com/3", "http://a.com/1", "http://a.com/2"]
+    assert queue.claim(0) is None
+
+
+def test_sharded_crawl_finishes_when_a_page_fails_after_all_articles_are_reserved(tmp_path, fake_site):
+    path = str(tmp_path / "frontier.sqlite3")
+    #hosts of each of the 2 shards
+    hosts = {}
+    for i in range(50):
+        hosts.setdefault(shard_of(f"http://host{i}.com/", 2), []).append(f"http://host{i}.com/")
+    #the worker of shard 0 scrapes the seed and then a slow page that fails, while it's being scraped all articles are reserved
+    #and the worker of shard 1 must wait instead of leaving its urls behind
+    seed, failing = hosts[0][0], hosts[0][1]
+    pages = {seed: [failing, hosts[1][0], hosts[1][1]], failing: [], hosts[1][0]: [], hosts[1][1]: []}
+    scraped = []
+
+    def worker(shard: int):
+        run = fake_site(pages, fail={failing})
+        def slow_run(query, **kwargs):
+            if query == failing:
+                time.sleep(0.3) #fails once the other worker has reserved the last article
+            return run(query, **kwargs)
+        crawler = newspaper3k_crawler(progress=False)
+        crawler.scraper_node.run = slow_run
+        queue = SQLiteQueue(path, 2)
+        scraped.extend(doc.meta["url"] for doc in crawler.run_shard(seed, 2, queue, shard, poll_interval=0.01)[0]["documents"])
+        queue.close()
+
+    SQLiteQueue(path, 2).push_links([seed], 0)
+    threads = [threading.Thread(target=worker, args=(shard,), daemon=True) for shard in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(scraped) == 2 and failing not in scraped
+
+
+def run_shards(crawlers: dict, path: str, n_shards: int, n_articles: int, **queue_kwargs):
+    '''
+    Runs run_shard of every shard -> crawler in a thread, returns the scraped urls or None if a worker didn't finish.
+    '''
+    scraped = []
+    def worker(shard: int):
+        queue = SQLiteQueue(path, n_shards, **queue_kwargs)
+        scraped.extend(doc.meta["url"] for doc in crawlers[shard].run_shard([], n_articles, queue, shard, poll_interval=0.01)[0]["documents"])
+        queue.close()
+    threads = [threading.Thread(target=worker, args=(shard,), daemon=True) for shard in crawlers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return None if any(thread.is_alive() for thread in threads) else scraped
+
+
+def test_url_of_a_dead_worker_is_crawled_once_its_lease_expires(tmp_path, fake_site):
+    path = str(tmp_path / "frontier.sqlite3")
+    pages = {"http://a.com/": ["http://a.com/1"], "http://a.com/1": []}
+    dead = SQLiteQueue(path, 1, lease=0.2)
+    dead.push_links(["http://a.com/"], 0)
+    assert dead.claim(0, 2) == ("http://a.com/", 0) #never reported done
+
+    crawler = newspaper3k_crawler(progress=False)
+    crawler.scraper_node.run = fake_site(pages)
+    assert run_shards({0: crawler}, path, 1, 2, lease=0.2) == ["http://a.com/", "http://a.com/1"]
+    assert not dead.done("http://a.com/") #too late, it was crawled again
+
+
+def test_shard_of_a_dead_worker_is_taken_over(tmp_path, fake_site):
+    path = str(tmp_path / "frontier.sqlite3")
+    hosts = {}
+    for i in range(50):
+        hosts.setdefault(shard_of(f"http://host{i}.com/", 2), []).append(f"http://host{i}.com/")
+    dead_page, other_page, found = hosts[1][0], hosts[1][1], hosts[0][0]
+    pages = {dead_page: [found], other_page: [], found: []}
+    dead = SQLiteQueue(path, 2, lease=0.2)
+    dead.push_links([dead_page, other_page], 0)
+    assert dead.claim(1, 3) == (dead_page, 0) #the worker of shard 1 dies scraping it
+
+    crawler = newspaper3k_crawler(progress=False)
+    crawler.scraper_node.run = fake_site(pages)
+    assert run_shards({0: crawler}, path, 2, 3, lease=0.2) == [dead_page, found, other_page]
@@ -0,0 +1,9 @@
+from newspaper3k_haystack.filters import UrlFilter
+
+
+def test_patterns_with_the_same_group_name():
+    url_filter = UrlFilter(positive=[r"/(?P<y>\d{4})/", r"/news/(?P<y>\d+)", r"/sport/\d+"])
+    assert url_filter("http://a.com/2023/story")
+    assert url_filter("http://a.com/news/12")
+    assert url_filter("http://a.com/sport/3")
+    assert not url_filter("http://a.com/about")
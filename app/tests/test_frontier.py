@@ -0,0 +1,26 @@
+from newspaper3k_haystack import Frontier, newspaper3k_crawler
+
+
+def test_push_links_beam_skips_seen_links():
+    frontier = Frontier()
+    frontier.mark_seen("http://a.com/")
+    frontier.push_links(["http://a.com/", "http://a.com/1", "http://a.com/2"], 1, beam=1)
+    frontier.push_links(["http://a.com/", "http://a.com/3", "http://a.com/4"], 2, beam=1)
+    assert [frontier.pop()[0] for _ in range(len(frontier))] == ["http://a.com/3", "http://a.com/1", "http://a.com/2", "http://a.com/4"]
+
+
+def test_push_links_counts_new_urls_once():
+    frontier = Frontier()
+    assert frontier.push_links(["http://a.com/1", "http://a.com/1", "http://a.com/2"], 1, beam=5) == 2
+    assert frontier.push_links(["http://a.com/1", "http://a.com/3"], 1) == 1
+
+
+def test_crawl_beam_1_is_depth_first_with_home_links(fake_site):
+    #every page links back home first, like site navigation
+    home = "http://news.com/"
+    pages = {home: [home + "a", home + "b"], home + "a": [home, home + "a/1", home + "a/2"],
+        home + "a/1": [home, home + "a/1/x"], home + "a/1/x": [home], home + "b": [home], home + "a/2": [home]}
+    crawler = newspaper3k_crawler(progress=False)
+    crawler.scraper_node.run = fake_site(pages)
+    docs = crawler.run(query=home, n_articles=4, beam=1, verbose_fails=False)[0]["documents"]
+    assert [doc.meta["url"] for doc in docs] == [home, home + "a", home + "a/1", home + "a/1/x"]
@@ -0,0 +1,57 @@
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import pytest
+from newspaper3k_haystack import newspaper3k_scraper
+
+PARAGRAPH = "<p>" + "The council approved the new budget for the city schools after a long debate on Tuesday night. " * 5 + "</p>"
+
+
+@pytest.fixture
+def image_server():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            self.send_response(404)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", requests
+    server.shutdown()
+
+
+def write_pages(folder, base: str, n: int):
+    for i in range(n):
+        images = "".join(f'<img src="{base}/image{i}_{j}.jpg">' for j in range(3))
+        (folder / f"page{i}.html").write_text(f"<html><head><title>Page {i}</title></head><body><article>{images}{PARAGRAPH * 4}</article></body></html>")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_profile_without_images_doesnt_download_them_from_folders(tmp_path, image_server, workers):
+    base, requests = image_server
+    write_pages(tmp_path, base, 2)
+    scraper = newspaper3k_scraper(profile="text+meta", progress=False)
+    docs = [doc for chunk in scraper.iter_load(str(tmp_path), workers=workers) for doc in chunk]
+    assert len(docs) == 2 and docs[0].meta["title"].startswith("Page")
+    assert requests == []
+
+
+def test_profile_without_images_doesnt_download_them_from_a_file(tmp_path, image_server):
+    base, requests = image_server
+    write_pages(tmp_path, base, 1)
+    scraper = newspaper3k_scraper(profile="text+meta", progress=False)
+    docs = scraper.run(str(tmp_path / "page0.html"), load=True)[0]["documents"]
+    assert len(docs) == 1
+    assert requests == []
+
+
+def test_images_downloaded_by_default(tmp_path, image_server):
+    base, requests = image_server
+    write_pages(tmp_path, base, 1)
+    newspaper3k_scraper(progress=False).run(str(tmp_path / "page0.html"), load=True)
+    assert len(requests) > 0
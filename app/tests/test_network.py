@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import pytest
+from newspaper3k_haystack import newspaper3k_scraper, ResponseCache
+
+PAGE = ("<html><head><title>News</title></head><body><article><p>"
+    + "The council approved the new budget for the city schools after a long debate on Tuesday night. " * 20
+    + '</p><a href="story">Story</a></article></body></html>').encode("utf-8")
+
+
+@pytest.fixture
+def redirect_server():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/news":
+                self.send_response(301)
+                self.send_header("Location", "/news/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_links_resolved_against_redirected_url(tmp_path, redirect_server, cache):
+    scraper = newspaper3k_scraper(cache=ResponseCache(str(tmp_path)) if cache else None, progress=False)
+    url = redirect_server + "/news"
+    for _ in range(2 if cache else 1): #the second run is a cache hit
+        doc = scraper.run(url, links=True)[0]["documents"][0]
+        assert doc.meta["url"] == url
+        assert redirect_server + "/news/story" in doc.meta["links"]
+
+
+def test_async_links_resolved_against_redirected_url(redirect_server):
+    async def scrape():
+        async with newspaper3k_scraper(progress=False) as scraper:
+            return (await scraper.arun(redirect_server + "/news", links=True))[0]["documents"][0]
+    assert redirect_server + "/news/story" in asyncio.run(scrape()).meta["links"]
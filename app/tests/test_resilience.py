@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import pytest
+from newspaper3k_haystack import newspaper3k_scraper, ResponseCache, HostHealth, Metrics
+from newspaper3k_haystack.concurrency import host_of
+from newspaper3k_haystack.resilience import afetch
+
+PAGE = ("<html><head><title>Budget</title></head><body><article><p>"
+    + "The council approved the new budget for the city schools after a long debate on Tuesday night. " * 20
+    + "</p></article></body></html>").encode("utf-8")
+
+
+@pytest.fixture
+def news_server():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_cache_hits_dont_change_host_latency(tmp_path, news_server):
+    health = HostHealth(min_timeout=0.5)
+    scraper = newspaper3k_scraper(request_timeout=7, cache=ResponseCache(str(tmp_path)), host_health=health, progress=False)
+    url = news_server + "/article/1"
+    scraper.run(url)
+    timeout = health.timeout(host_of(url), 7)
+    srtt = health._hosts[host_of(url)].srtt
+    for _ in range(20):
+        assert len(scraper.run(url)[0]["documents"]) == 1
+
+    assert health._hosts[host_of(url)].srtt == srtt
+    assert health.timeout(host_of(url), 7) == timeout
+
+
+def test_cache_hits_dont_count_as_downloads(tmp_path, news_server):
+    metrics = Metrics()
+    scraper = newspaper3k_scraper(cache=ResponseCache(str(tmp_path)), metrics=metrics, progress=False)
+    url = news_server + "/article/1"
+    for _ in range(3):
+        assert len(scraper.run(url)[0]["documents"]) == 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["cache_hits"] == 2
+    assert snapshot["counters"]["bytes_fetched"] == len(PAGE)
+    assert snapshot["stages"]["download"]["count"] == 1
+
+
+def test_cancelled_trial_request_lets_another_one_through():
+    health = HostHealth(failure_threshold=1, cooldown=0)
+    health.failure("a.com") #circuit opens, the next request is the half open trial
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(afetch(hang, "http://a.com/1", 7, health=health), 0.05))
+    assert health.allow("a.com")
@@ -0,0 +1,37 @@
+import os
+import pickle
+from newspaper3k_haystack import DiskSeenSet, newspaper3k_crawler
+
+
+def test_disk_backend_starts_empty_every_time(fake_site):
+    pages = {"http://a.com/": ["http://a.com/1", "http://a.com/2"], "http://a.com/1": [], "http://a.com/2": []}
+    for _ in range(2):
+        crawler = newspaper3k_crawler(seen="disk", progress=False)
+        crawler.scraper_node.run = fake_site(pages)
+        assert len(crawler.run(query="http://a.com/", n_articles=3, verbose_fails=False)[0]["documents"]) == 3
+
+
+def test_temporary_database_removed_on_close():
+    seen = DiskSeenSet()
+    assert seen.add("http://a.com/") and not seen.add("http://a.com/")
+    seen.close()
+    assert not os.path.exists(seen.path)
+
+
+def test_database_with_path_persists(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    seen = DiskSeenSet(path)
+    seen.add("http://a.com/")
+    seen.close()
+    assert "http://a.com/" in DiskSeenSet(path)
+    assert os.path.exists(path)
+
+
+def test_pickled_copy_shares_database():
+    seen = DiskSeenSet()
+    seen.add("http://a.com/")
+    copy = pickle.loads(pickle.dumps(seen))
+    assert "http://a.com/" in copy
+    copy.close()
+    assert os.path.exists(seen.path)
+    seen.close()
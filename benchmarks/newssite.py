@@ -0,0 +1,154 @@
+import os
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = ("the of and to in a is that for on was with as by at from his her they have were said after year people "
+    "government city police president minister election market company report week state country team season police "
+    "court health school water energy price million percent officials north south coast mountain river travel train").split()
+
+
+class NewsSite:
+    '''
+    Synthetic news site served on localhost, every page is generated from its number so runs are reproducible.
+    Pages are /section/<n> and /article/<n>, articles have a headline, a byline, paragraphs of text and links to other pages.
+
+    graph "tree": page n links to its children fanout*n+1 ... fanout*n+fanout (the site is depth levels deep) plus a few random ones.
+    graph "random": every page links to fanout random pages.
+    '''
+
+    def __init__(self,
+    pages: int = 1000,
+    graph: str = "tree",
+    fanout: int = 8,
+    words: int = 800,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 0
+    ):
+        '''
+        :param pages: (1000 by default) number of pages of the site.
+        :param graph: ("tree" by default) link graph, "tree" or "random".
+        :param fanout: (8 by default) links to other pages of the site per page.
+        :param words: (800 by default) words of article text per page, sets the page size (about 6 bytes per word plus the markup).
+        :param latency: (0 by default) seconds every response is delayed.
+        :param jitter: (0 by default) extra random delay of up to jitter seconds.
+        :param error_rate: (0 by default) fraction of requests answered with a 503.
+        :param seed: (0 by default) seed of the generated content.
+        '''
+        assert graph in ("tree", "random"), "graph must be tree or random"
+        self.pages = pages
+        self.graph = graph
+        self.fanout = fanout
+        self.words = words
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests = 0
+        self._server = None
+
+    def start(self, port: int = 0):
+        '''
+        Starts serving in a background thread, returns the base url.
+        '''
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" #keep alive
+            def log_message(self, *args):
+                pass
+            def do_GET(self):
+                site._handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def page_url(self, n: int, base: str = None):
+        return f"{base or self.url}/{'section' if self._is_section(n) else 'article'}/{n}"
+
+    def depth(self, n: int):
+        '''
+        Level of page n in the tree graph, 0 for the home page.
+        '''
+        level = 0
+        while n > 0:
+            n = (n - 1) // self.fanout
+            level += 1
+        return level
+
+    def links(self, n: int):
+        r = random.Random(self.seed * 1000003 + n)
+        if self.graph == "tree":
+            children = [c for c in range(self.fanout * n + 1, self.fanout * n + self.fanout + 1) if c < self.pages]
+            return children + [r.randrange(self.pages) for _ in range(2)] #a couple of cross links, related articles
+        return [r.randrange(self.pages) for _ in range(self.fanout)]
+
+    def html(self, n: int, base: str = ""):
+        '''
+        Html of page n, links relative to base.
+        '''
+        r = random.Random(self.seed * 1000003 + n)
+        title = " ".join(r.choice(WORDS) for _ in range(8)).capitalize()
+        paragraphs = []
+        left = self.words
+        while left > 0:
+            size = min(left, r.randint(40, 120))
+            paragraphs.append(" ".join(r.choice(WORDS) for _ in range(size)).capitalize() + ".")
+            left -= size
+        links = "".join(f'<li><a href="{self.page_url(link, base)}">{link}</a></li>' for link in self.links(n))
+        return (f"<html lang=\"en\"><head><title>{title} | Synthetic News</title>"
+            f"<meta name=\"author\" content=\"Reporter {n % 50}\"><meta property=\"article:published_time\" content=\"2023-01-{n % 28 + 1:02d}\">"
+            f"</head><body><nav><a href=\"{base}/\">Home</a></nav><article><h1>{title}</h1><p class=\"byline\">By Reporter {n % 50}</p>"
+            + "".join(f"<p>{p}</p>" for p in paragraphs)
+            + f"</article><aside><ul>{links}</ul></aside><footer>Synthetic News</footer></body></html>")
+
+    def write(self, directory: str, pages: int = None):
+        '''
+        Writes the html of the first pages (all by default) to directory, for load=True ingestion.
+        '''
+        os.makedirs(directory, exist_ok=True)
+        for n in range(pages or self.pages):
+            with open(os.path.join(directory, f"page_{n}.html"), "w") as file:
+                file.write(self.html(n, "http://news.example"))
+
+    def _is_section(self, n: int):
+        return self.graph == "tree" and self.fanout * n + 1 < self.pages
+
+    def _handle(self, handler):
+        self.requests += 1
+        r = random.Random()
+        if self.latency or self.jitter:
+            time.sleep(self.latency + r.uniform(0, self.jitter))
+        try:
+            n = int(handler.path.rstrip("/").rsplit("/", 1)[-1] or 0) if handler.path != "/" else 0
+        except ValueError:
+            n = -1
+        if n < 0 or n >= self.pages:
+            self._send(handler, 404, b"")
+            return
+        if self.error_rate and r.random() < self.error_rate:
+            self._send(handler, 503, b"")
+            return
+        self._send(handler, 200, self.html(n).encode("utf-8"))
+
+    def _send(self, handler, status: int, body: bytes):
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
@@ -0,0 +1,264 @@
+'''
+Offline throughput benchmarks of newspaper3k_haystack against a local synthetic news site (see newssite.py).
+Every scenario runs in a fresh process so its cpu time and peak memory are its own, the site is served from this process.
+
+    PYTHONPATH=app/src python -m benchmarks.run --output results.json
+    PYTHONPATH=app/src python -m benchmarks.run --compare baseline.json results.json
+'''
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from queue import Empty
+from .newssite import NewsSite
+
+PAGE_NUMBER = re.compile(r"/(\d+)/?$")
+
+
+def percentile(values: list, q: float):
+    '''
+    Nearest rank percentile, None if there are no values.
+    '''
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+
+def _time_calls(obj, name: str, samples: list):
+    '''
+    Replaces the method name of obj by one that appends the seconds of every call to samples.
+    '''
+    method = getattr(obj, name)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    setattr(obj, name, timed)
+
+
+def _stage_collector(stages: dict):
+    def callback(name, value, labels):
+        if name == "stage_seconds":
+            stages.setdefault(labels["stage"], []).append(value)
+    return callback
+
+
+def bench_run_batch(site: NewsSite, base: str, pages: int, workers: int, metrics, latencies: list):
+    from newspaper3k_haystack import newspaper3k_scraper
+    urls = [site.page_url(n, base) for n in range(pages)]
+    with newspaper3k_scraper(pool_maxsize=max(10, workers), metrics=metrics, progress=False) as scraper:
+        _time_calls(scraper, "run", latencies)
+        docs = scraper.run_batch(urls, workers=workers, verbose_fails=False)[0]["documents"]
+    return len(docs), {}
+
+
+def bench_load(site: NewsSite, base: str, pages: int, workers: int, metrics, latencies: list, directory: str = None):
+    from newspaper3k_haystack import newspaper3k_scraper
+    scraper = newspaper3k_scraper(metrics=metrics, progress=False)
+    docs = 0
+    for chunk in scraper.iter_load(directory, workers=workers, verbose_fails=False): #same path as run(load=True) on a folder
+        docs += len(chunk)
+    return docs, {}
+
+
+def bench_crawl(site: NewsSite, base: str, pages: int, workers: int, metrics, latencies: list, beam: int = 0):
+    from newspaper3k_haystack import newspaper3k_crawler
+    with newspaper3k_crawler(pool_maxsize=max(10, workers), metrics=metrics, progress=False) as crawler:
+        _time_calls(crawler.scraper_node, "run", latencies)
+        #the synthetic site is a single host, let every worker fetch from it at once or the workers are serialized
+        docs = crawler.run(query=site.page_url(0, base), n_articles=pages, beam=beam, workers=workers,
+            host_delay=0.0, host_max_in_flight=workers, verbose_fails=False)[0]["documents"]
+    numbers = [PAGE_NUMBER.search(doc.meta["url"]) for doc in docs]
+    depths = [site.depth(int(match.group(1))) for match in numbers if match]
+    return len(docs), {"max_depth": max(depths, default=0)}
+
+
+SCENARIOS = {
+    "scraper.run_batch": bench_run_batch,
+    "scraper.load": bench_load,
+    "crawler.run": bench_crawl,
+}
+
+
+def _run_scenario(name: str, site_kwargs: dict, base: str, params: dict, queue):
+    '''
+    Child process of a scenario, puts its measures in queue.
+    '''
+    from newspaper3k_haystack import Metrics
+    site = NewsSite(**site_kwargs)
+    stages = {}
+    latencies = []
+    metrics = Metrics(callback=_stage_collector(stages))
+    start = time.perf_counter()
+    docs, extra = SCENARIOS[name](site, base, metrics=metrics, latencies=latencies, **params)
+    seconds = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN) #process pool workers of load
+    counters = metrics.snapshot()["counters"]
+    queue.put(dict({
+        "scenario": name,
+        "params": {k: v for k, v in params.items() if k != "directory"},
+        "documents": docs,
+        "seconds": seconds,
+        "pages_per_sec": docs / seconds if seconds else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "stages": {stage: {"count": len(values), "seconds": sum(values), "p50": percentile(values, 50), "p99": percentile(values, 99)}
+            for stage, values in stages.items()},
+        "cpu_user": usage.ru_utime + children.ru_utime,
+        "cpu_system": usage.ru_stime + children.ru_stime,
+        "peak_rss_mb": _rss_mb(usage.ru_maxrss),
+        "children_peak_rss_mb": _rss_mb(children.ru_maxrss),
+        "bytes_fetched": counters.get("bytes_fetched", 0),
+        "failures": counters.get("failures", {}),
+    }, **extra))
+
+
+def _rss_mb(maxrss: int):
+    return maxrss / 1024 ** 2 if sys.platform == "darwin" else maxrss / 1024 #bytes on macOS, KiB on linux
+
+
+def run_suite(args):
+    site_kwargs = {"pages": args.pages, "graph": args.graph, "fanout": args.fanout, "words": args.words,
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate, "seed": args.seed}
+    site = NewsSite(**site_kwargs)
+    base = site.start()
+    tmp = tempfile.TemporaryDirectory(prefix="newspaper3k_bench_")
+    directory = tmp.name
+    site.write(directory, args.load_pages)
+
+    plan = []
+    for workers in args.workers:
+        plan.append(("scraper.run_batch", {"pages": args.batch_pages, "workers": workers}))
+        plan.append(("scraper.load", {"pages": args.load_pages, "workers": workers, "directory": directory}))
+        for n_articles in args.crawl_sizes:
+            for beam in args.beams:
+                plan.append(("crawler.run", {"pages": n_articles, "workers": workers, "beam": beam}))
+    if args.only:
+        plan = [(name, params) for name, params in plan if name in args.only]
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for name, params in plan:
+            queue = context.Queue()
+            process = context.Process(target=_run_scenario, args=(name, site_kwargs, base, params, queue))
+            process.start()
+            result = _result(queue, process, name)
+            process.join()
+            results.append(result)
+            print(f"{name:20} {json.dumps(result['params']):50} {result['pages_per_sec']:8.1f} pages/s  "
+                f"p50 {_ms(result['latency_p50'])}  p99 {_ms(result['latency_p99'])}  rss {result['peak_rss_mb']:.0f}MB", flush=True)
+    finally:
+        site.stop()
+        tmp.cleanup()
+
+    report = {
+        "package_version": _package_version(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "site": site_kwargs,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+def _result(queue, process, name: str):
+    '''
+    Waits for the measures of a scenario process, raises if it died without sending them.
+    '''
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"{name} benchmark failed with exit code {process.exitcode}")
+
+
+def compare(baseline: str, current: str, threshold: float):
+    '''
+    Prints the pages/sec change of every scenario found in both result files, returns False if any got slower than threshold.
+    '''
+    with open(baseline) as file:
+        old = {_key(r): r for r in json.load(file)["results"]}
+    with open(current) as file:
+        new = {_key(r): r for r in json.load(file)["results"]}
+    ok = True
+    for key in new:
+        if key not in old or not old[key]["pages_per_sec"]:
+            continue
+        change = new[key]["pages_per_sec"] / old[key]["pages_per_sec"] - 1
+        regression = change < -threshold
+        ok = ok and not regression
+        print(f"{key[0]:20} {key[1]:50} {old[key]['pages_per_sec']:8.1f} -> {new[key]['pages_per_sec']:8.1f} pages/s {change:+7.1%}"
+            + ("  REGRESSION" if regression else ""))
+    return ok
+
+
+def _key(result: dict):
+    return result["scenario"], json.dumps(result["params"], sort_keys=True)
+
+
+def _ms(seconds):
+    return "   -   " if seconds is None else f"{seconds * 1000:5.1f}ms"
+
+
+def _package_version():
+    try:
+        from importlib.metadata import version
+        return version("newspaper3k_haystack")
+    except Exception: #not installed, e.g. run from a checkout with PYTHONPATH
+        return None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of newspaper3k_haystack against a synthetic news site.")
+    parser.add_argument("--output", help="json file to write the results to")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="pages/sec drop reported as a regression by --compare (0.1 by default)")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="scenarios to run, all by default")
+    parser.add_argument("--pages", type=int, default=2000, help="pages of the synthetic site")
+    parser.add_argument("--graph", choices=["tree", "random"], default="tree", help="link graph of the site")
+    parser.add_argument("--fanout", type=int, default=8, help="links per page")
+    parser.add_argument("--words", type=int, default=800, help="words of text per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses that are 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8], help="worker counts to run every scenario with")
+    parser.add_argument("--batch-pages", type=int, default=200, help="urls scraped by run_batch")
+    parser.add_argument("--load-pages", type=int, default=500, help="html files ingested with load=True")
+    parser.add_argument("--crawl-sizes", type=int, nargs="+", default=[50, 200], help="n_articles of the crawls")
+    parser.add_argument("--beams", type=int, nargs="+", default=[0, 1, 5], help="beam values of the crawls")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(args.compare[0], args.compare[1], args.threshold) else 1)
+    run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
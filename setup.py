@@ -13,7 +13,7 @@ setup(
         description=DESCRIPTION,
         long_description=LONG_DESCRIPTION,
         packages=find_packages(),
-        install_requires=['haystack','newspaper3k','beautifulsoup4','tqdm'], 
+        install_requires=['haystack','newspaper3k','tqdm'], 
         keywords=['haystack', 'newspaper3k'],
         classifiers= [
             "Development Status :: 3 - Alpha",